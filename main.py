@@ -13,21 +13,23 @@
     python main.py
 """
 
+import asyncio
+import signal
 import sys
-import threading
+from functools import partial
 from typing import Optional, Tuple
 
 import src.config as config
 from src.client import DoubaoClient
 from src.command_handler import parse_command
-from src.config import COLORS, HISTORY_MAX_TURNS, SYMBOLS
+from src.config import COLORS, CURSOR_UP_CLEAR, HISTORY_MAX_TURNS, SYMBOLS
 from src.key_manager import get_key_manager
 from src.ui import (
     StreamOutputHandler,
+    WaitingAnimation,
     colored_print,
     print_usage,
     print_welcome,
-    waiting_animation,
 )
 from src.utils import (
     InputHandler,
@@ -38,6 +40,15 @@ from src.utils import (
 )
 
 
+def _raise_keyboard_interrupt(signum, frame) -> None:
+    """SIGINT 处理函数：直接抛出 KeyboardInterrupt
+    
+    asyncio.run 默认接管 SIGINT，只取消主任务并唤醒事件循环；
+    而阻塞在读取输入上的系统调用被信号打断后会自动重试，Ctrl+C 要等到
+    按下回车才生效。换成直接抛出异常的处理函数后，asyncio.run 不再接管，
+    等待输入时按 Ctrl+C 立即退出。
+    """
+    raise KeyboardInterrupt
 
 
 def display_history(num_turns: int) -> None:
@@ -79,8 +90,9 @@ def display_history(num_turns: int) -> None:
     colored_print(f"\n{SYMBOLS['star']} {SYMBOLS['separator'] * 60} {SYMBOLS['star']}\n", 'separator_line')
 
 
-def process_ai_response(
+async def process_ai_response(
     client: DoubaoClient,
+    output_handler: StreamOutputHandler,
     message: str,
     thinking_mode: str,
     thinking_status: str
@@ -89,6 +101,7 @@ def process_ai_response(
     
     Args:
         client: 豆包客户端
+        output_handler: 流式输出处理器（整个会话复用，每轮开始时重置）
         message: 用户消息
         thinking_mode: 思考模式（'auto', 'enabled', 'disabled'）
         thinking_status: 思考状态标记文本
@@ -96,36 +109,47 @@ def process_ai_response(
     Returns:
         (short_id, bot_reply): 短 ID 和 AI 回复内容（不含思考部分）
     """
-    # 启动等待动画
-    stop_animation = threading.Event()
-    animation_thread = threading.Thread(
-        target=waiting_animation,
-        args=(stop_animation,)
-    )
-    animation_thread.daemon = True
-    animation_thread.start()
+    # 启动等待动画（asyncio 任务，收到第一个 chunk 时取消）
+    animation = WaitingAnimation()
+    animation.start()
     
     try:
-        output_handler = StreamOutputHandler()
+        output_handler.reset()
         
-        # 处理流式回复
-        for chunk_data in client.chat_stream(message, thinking_mode):
-            output_handler.process_chunk(chunk_data, stop_animation, thinking_status)
+        # 处理流式回复：等待网络数据时事件循环继续驱动等待动画
+        process_chunk = partial(
+            output_handler.process_chunk,
+            stop_animation=animation.stop,
+            thinking_status=thinking_status
+        )
+        async for chunk_data in client.chat_stream_async(message, thinking_mode):
+            process_chunk(chunk_data)
         
         # 完成输出
-        output_handler.finalize(stop_animation)
+        output_handler.finalize(animation.stop)
         
         # 返回短id和回复内容
         return output_handler.get_short_id(), output_handler.get_bot_reply()
         
     except Exception as e:
-        stop_animation.set()
-        print('\r' + ' ' * 80, end='')
+        animation.stop()
+        # 保留已经输出的部分回复：刷新缓冲后另起一行显示错误；还没有输出时清除等待动画
+        output_handler.flush()
+        if output_handler.first_chunk_received:
+            print()
+        else:
+            print('\r' + ' ' * 80, end='')
         colored_print(f"\r{SYMBOLS['error']} 流式输出异常: {e}", 'system_error')
         return None, None
+    
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        # Ctrl+C 中断回复：先把缓冲中尚未显示的内容输出，再交给上层退出
+        animation.stop()
+        output_handler.flush()
+        raise
 
 
-def chat_loop(
+async def chat_loop(
     client: DoubaoClient,
     input_handler: InputHandler,
     battery_monitor
@@ -142,6 +166,9 @@ def chat_loop(
     # 获取历史管理器
     history = get_chat_history(HISTORY_MAX_TURNS)
     
+    # 流式输出处理器在整个会话中复用
+    output_handler = StreamOutputHandler()
+    
     while True:
         # 显示对话状态
         conv_length = client.get_conversation_length()
@@ -156,16 +183,14 @@ def chat_loop(
             True
         )
         
-        # 重新显示用户输入（确保格式一致）
-        if user_input.strip():
-            print(f"\033[1A\033[2K", end="")
-            colored_print(f" 您{status}: {user_input}", 'user_text')
-        
-        # 检查输入是否为空
-        if not user_input.strip():
+        # 检查输入是否为空（get_input 返回的内容已去除首尾空白）
+        if not user_input:
             colored_print(f"{SYMBOLS['warning']}  没有收到你的文字哦，请输入有效的消息", 'system_warning')
             continue
         
+        # 重新显示用户输入（确保格式一致）：清除原输入行与重新输出合并为一次写入
+        colored_print(f"{CURSOR_UP_CLEAR} 您{status}: {user_input}", 'user_text')
+        
         # 记录用户活动时间（用于电池自适应刷新）
         battery_monitor.update_user_activity()
         
@@ -173,32 +198,32 @@ def chat_loop(
         cmd_result = parse_command(user_input)
         
         # 处理退出命令
-        if cmd_result['type'] == 'exit':
-            colored_print(cmd_result['response'], 'system_info')
+        if cmd_result.type == 'exit':
+            colored_print(cmd_result.response, 'system_info')
             break
         
         # 处理清空历史命令
-        if cmd_result['type'] == 'clear':
+        if cmd_result.type == 'clear':
             client.clear_history()
-            colored_print(cmd_result['response'], 'system_success')
+            colored_print(cmd_result.response, 'system_success')
             # 保存清空命令到历史
             history.save_command('clear', '对话历史已清空')
             
             # 如果有消息内容，继续发送消息
-            if cmd_result['message'].strip():
+            if cmd_result.message:
                 # 修改命令类型为chat，继续处理
-                cmd_result['type'] = 'chat'
+                cmd_result.type = 'chat'
             else:
                 continue
         
         # 处理历史记录查看命令
-        if cmd_result['type'] == 'history':
-            display_history(cmd_result.get('history_turns', 10))
+        if cmd_result.type == 'history':
+            display_history(cmd_result.extra.get('history_turns', 10))
             continue
         
         # 处理删除历史记录命令
-        if cmd_result['type'] == 'hdel':
-            delete_turns = cmd_result.get('delete_turns', 0)
+        if cmd_result.type == 'hdel':
+            delete_turns = cmd_result.extra.get('delete_turns', 0)
             deleted_count = history.delete_recent_turns(delete_turns)
             
             if deleted_count > 0:
@@ -221,15 +246,15 @@ def chat_loop(
             continue
         
         # 处理错误命令
-        if cmd_result['type'] == 'error':
-            colored_print(cmd_result['response'], 'system_warning')
+        if cmd_result.type == 'error':
+            colored_print(cmd_result.response, 'system_warning')
             continue
         
         # 处理聊天消息
-        if cmd_result['type'] == 'chat':
+        if cmd_result.type == 'chat':
             # 如果指定了target_response_id，则切换对话上下文
-            if cmd_result['target_response_id']:
-                target_id = cmd_result['target_response_id']
+            if cmd_result.target_response_id:
+                target_id = cmd_result.target_response_id
                 
                 # 验证短id是否存在于历史记录中
                 id_mapper = get_id_mapper()
@@ -254,24 +279,29 @@ def chat_loop(
             
             # 处理AI响应
             print()
-            short_id, bot_reply = process_ai_response(
+            short_id, bot_reply = await process_ai_response(
                 client,
-                cmd_result['message'],
-                cmd_result['thinking_mode'],
-                cmd_result['thinking_status']
+                output_handler,
+                cmd_result.message,
+                cmd_result.thinking_mode,
+                cmd_result.thinking_status
             )
             
+            # 回复输出可能冲掉了电池显示，立即重绘（在后台调度线程中执行）
+            battery_monitor.refresh_now()
+            
             # 保存聊天记录到历史
             if short_id and bot_reply:
                 # 获取长response_id
                 id_mapper = get_id_mapper()
                 long_id = id_mapper.get_long_id(short_id)
                 
-                if long_id:
+                # 重复发送而直接重复上一条回复时，这一轮已经记录过，不再重复保存
+                if long_id and not client.last_request_replayed:
                     history.save_chat_turn(
                         short_id=short_id,
                         response_id=long_id,
-                        user_message=cmd_result['message'],
+                        user_message=cmd_result.message,
                         bot_reply=bot_reply
                     )
             elif not short_id or not bot_reply:
@@ -361,12 +391,18 @@ def main() -> None:
             f"{SYMBOLS['success']} 豆包 AI 客户端初始化成功",
             'system_success'
         )
+        if client.previous_response_id:
+            colored_print(
+                f"{SYMBOLS['info']} 已恢复上次的对话，输入 #new 开始新话题",
+                'system_info'
+            )
         
         # 初始化输入处理器
         input_handler = InputHandler()
         
-        # 进入主聊天循环
-        chat_loop(client, input_handler, battery_monitor)
+        # 进入主聊天循环（先安装 SIGINT 处理函数，见 _raise_keyboard_interrupt）
+        signal.signal(signal.SIGINT, _raise_keyboard_interrupt)
+        asyncio.run(chat_loop(client, input_handler, battery_monitor))
         
     except ValueError as e:
         colored_print(f"{SYMBOLS['error']} 配置错误: {e}", 'system_error')
@@ -6,31 +6,383 @@
 - 上下文对话管理
 - 深度思考模式
 - 联网搜索
-- 流式输出
+- 流式输出（同步迭代器 / asyncio 异步迭代器）
 """
 
-from typing import Any, Dict, Iterator, Optional
-
-from volcenginesdkarkruntime import Ark
+import asyncio
+import atexit
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import weakref
+from collections import deque
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
 
 from . import config
 from .utils.id_mapper import get_id_mapper
+from .utils.response_cache import ResponseCache, get_response_cache
+
+if TYPE_CHECKING:
+    from volcenginesdkarkruntime import Ark, AsyncArk
+
+
+# 流式请求附加的 HTTP 头：要求中间代理（如 nginx）不缓冲、不压缩，
+# 每个 token 生成后立即转发，避免首字延迟被缓冲区拖长
+_STREAM_HEADERS = {
+    "Accept-Encoding": "identity",
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",
+}
+
+# 请求中不变的参数，模块加载时构建一次，每次请求直接引用
+_WEB_SEARCH_TOOLS = [config.WEB_SEARCH_CONFIG]
+_THINKING = {
+    mode: {"type": mode}
+    for mode in ("auto", "enabled", "disabled")
+}
+_CACHING = {"type": "enabled"}
+
+# 只对用户给出的文本做变换的任务（翻译、改写、正则、格式整理），不需要外部信息；
+# 写文章、写代码、计算等任务可能涉及事实和数据，不在此列
+_LOCAL_TASK_RE = re.compile(r'翻译|改写|润色|正则|格式化|排版')
+# 涉及时效信息的提问，即使是本地任务也保留联网搜索
+_TIME_SENSITIVE_RE = re.compile(r'今天|今年|昨天|明天|最近|最新|现在|目前|实时|新闻|天气|股价|价格|多少钱|比分|比赛|几点|汇率')
+
+
+def _needs_web_search(message: str) -> bool:
+    """判断请求是否可能需要联网搜索（宁可多带，不可漏带）
+    
+    只有明显是本地任务、且不涉及时效信息的请求才判定为不需要。
+    """
+    if not config.WEB_SEARCH_SKIP_LOCAL_TASKS:
+        return True
+    if _TIME_SENSITIVE_RE.search(message):
+        return True
+    return _LOCAL_TASK_RE.search(message) is None
+
+
+# 会话文件中各字段允许的类型（缺少的字段按 None 处理）
+_SESSION_FIELD_TYPES = {
+    'model': (str,),
+    'system_prompt_hash': (str,),
+    'previous_response_id': (str, type(None)),
+    'conversation_count': (int, type(None)),
+    'chain_turns': (int, type(None)),
+    'context_summary': (str, type(None)),
+    'recent_turns': (list, type(None)),
+    'saved_at': (int, float, type(None)),
+}
+
+
+def _is_valid_session(session: Any) -> bool:
+    """检查会话文件内容的结构（手工修改或写坏的文件不应让启动失败）"""
+    if not isinstance(session, dict):
+        return False
+    for key, types in _SESSION_FIELD_TYPES.items():
+        if not isinstance(session.get(key), types):
+            return False
+    return all(
+        isinstance(turn, list) and len(turn) == 2 and all(isinstance(text, str) for text in turn)
+        for turn in session.get('recent_turns') or ()
+    )
+
+
+# 上下文过长时用于生成对话摘要的提示
+_SUMMARY_PROMPT = (
+    "请用不超过200字概括以上对话的要点，包括我的问题、你给出的关键结论，"
+    "以及后续对话需要记住的信息。只输出摘要本身。"
+)
+
+
+# 可以合并的文本增量类型
+_TEXT_CHUNK_TYPES = ('content', 'reasoning')
+
+
+class _DeltaBatcher:
+    """文本增量合并器（_coalesce_deltas 与其异步版本共用）
+    
+    合并窗口从 coalesce_ms 的 1/9 开始，每输出一次扩大 3 倍直到 coalesce_ms：
+    回复开头几块很快输出，之后逐渐合并成较大的块。
+    缓冲的增量数达到 max_parts 时不等窗口结束立即输出。
+    """
+    
+    __slots__ = ('max_window', 'window', 'max_parts', 'next_emit', 'pending', 'parts')
+    
+    def __init__(self, coalesce_ms: int, max_parts: int):
+        self.max_window = coalesce_ms / 1000
+        self.window = self.max_window / 9
+        self.max_parts = max_parts
+        self.next_emit = 0.0  # 第一块立即输出，首字延迟不受影响
+        self.pending: Optional[Dict[str, Any]] = None
+        self.parts: list = []
+    
+    def add(self, chunk_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """加入一个文本增量，到达输出时间或数量上限时返回合并后的 chunk"""
+        kind = chunk_data['type']
+        if self.pending is None:
+            self.pending = chunk_data
+            self.parts = [chunk_data[kind]]
+        else:
+            self.parts.append(chunk_data[kind])
+        
+        now = time.monotonic()
+        if now < self.next_emit and len(self.parts) < self.max_parts:
+            return None
+        self.next_emit = now + self.window
+        if self.window < self.max_window:
+            self.window = min(self.window * 3, self.max_window)
+        return self.flush()
+    
+    def flush(self) -> Optional[Dict[str, Any]]:
+        """取出已缓冲的内容，没有时返回 None"""
+        pending = self.pending
+        if pending is not None:
+            pending[pending['type']] = ''.join(self.parts)
+            self.pending = None
+        return pending
+    
+    def must_flush_before(self, kind: str) -> bool:
+        """下一个 chunk 不能与缓冲内容合并（类型不同或不是文本增量）时返回 True"""
+        return self.pending is not None and self.pending['type'] != kind
+
+
+def _coalesce_deltas(
+    chunks: Iterator[Dict[str, Any]],
+    coalesce_ms: int,
+    max_parts: int = 64
+) -> Iterator[Dict[str, Any]]:
+    """把短时间内连续到达的同类文本增量合并为一个 chunk（规则见 _DeltaBatcher）
+    
+    调用方逐块打印时，单字增量意味着每个字一次 yield 和一次终端输出；
+    合并后 chunk 格式不变，只是每块内容更长。类型变化或其他事件到达时先输出已缓冲的内容。
+    """
+    if coalesce_ms <= 0:
+        yield from chunks
+        return
+    
+    batcher = _DeltaBatcher(coalesce_ms, max_parts)
+    for chunk_data in chunks:
+        kind = chunk_data['type']
+        if batcher.must_flush_before(kind):
+            pending = batcher.flush()
+            if pending is not None:
+                yield pending
+        if kind not in _TEXT_CHUNK_TYPES:
+            yield chunk_data
+            continue
+        ready = batcher.add(chunk_data)
+        if ready is not None:
+            yield ready
+    
+    rest = batcher.flush()
+    if rest is not None:
+        yield rest
+
+
+async def _coalesce_deltas_async(
+    chunks: AsyncIterator[Dict[str, Any]],
+    coalesce_ms: int,
+    max_parts: int = 64
+) -> AsyncIterator[Dict[str, Any]]:
+    """_coalesce_deltas 的异步版本"""
+    if coalesce_ms <= 0:
+        async for chunk_data in chunks:
+            yield chunk_data
+        return
+    
+    batcher = _DeltaBatcher(coalesce_ms, max_parts)
+    async for chunk_data in chunks:
+        kind = chunk_data['type']
+        if batcher.must_flush_before(kind):
+            pending = batcher.flush()
+            if pending is not None:
+                yield pending
+        if kind not in _TEXT_CHUNK_TYPES:
+            yield chunk_data
+            continue
+        ready = batcher.add(chunk_data)
+        if ready is not None:
+            yield ready
+    
+    rest = batcher.flush()
+    if rest is not None:
+        yield rest
+
+
+# 所有客户端共享的 HTTP 连接池
+_shared_http_client = None
+_shared_http_client_lock = threading.Lock()
+
+
+def _get_shared_http_client():
+    """获取共享的 httpx 连接池（懒加载）
+    
+    多个 DoubaoClient（以及摘要等附加请求）复用同一组 keep-alive 连接，
+    后续请求不必重新进行 TCP/TLS 握手。程序退出时自动关闭。
+    
+    Returns:
+        httpx.Client 实例；httpx 不可用时返回 None，由 SDK 自行创建连接
+    """
+    global _shared_http_client
+    if _shared_http_client is None:
+        with _shared_http_client_lock:
+            if _shared_http_client is None:
+                try:
+                    import httpx  # SDK 自身依赖 httpx，随 SDK 一起安装
+                except ImportError:
+                    return None
+                client = httpx.Client(**_http_pool_options(httpx))
+                atexit.register(client.close)
+                _shared_http_client = client
+    return _shared_http_client
+
+
+# 每个事件循环共享的异步连接池（异步连接绑定在创建它的事件循环上，不能跨循环复用）
+_shared_async_http_clients: 'weakref.WeakKeyDictionary' = weakref.WeakKeyDictionary()
+
+
+def _get_shared_async_http_client():
+    """获取当前事件循环共享的 httpx.AsyncClient（懒加载）
+    
+    同一事件循环中的多个对话共用一组 keep-alive 连接。
+    
+    Returns:
+        httpx.AsyncClient 实例；httpx 不可用时返回 None
+    """
+    loop = asyncio.get_running_loop()
+    client = _shared_async_http_clients.get(loop)
+    if client is None:
+        try:
+            import httpx
+        except ImportError:
+            return None
+        client = httpx.AsyncClient(**_http_pool_options(httpx))
+        _shared_async_http_clients[loop] = client
+    return client
+
+
+def _http_pool_options(httpx) -> Dict[str, Any]:
+    """连接池参数：单用户 CLI 只需少量连接；深度思考回复可能很长，读超时放宽
+    
+    httpx 默认空闲连接 5 秒后关闭，而用户阅读回复、输入下一条消息通常远超 5 秒，
+    连接几乎每轮都要重新握手；空闲保持时间延长到 60 秒，连续对话时一直复用同一连接。
+    """
+    return {
+        "limits": httpx.Limits(
+            max_connections=8,
+            max_keepalive_connections=4,
+            keepalive_expiry=60.0
+        ),
+        "timeout": httpx.Timeout(600.0, connect=10.0, write=30.0, pool=10.0),
+    }
+
+
+@lru_cache(maxsize=None)
+def _get_ark_cls(async_client: bool = False):
+    """延迟导入火山引擎 SDK 客户端类
+    
+    SDK 会连带导入 httpx、pydantic 等大量依赖，
+    推迟到真正创建客户端时再导入，加快程序启动；结果缓存，只导入一次。
+    
+    Args:
+        async_client: 为 True 时返回 AsyncArk，否则返回 Ark
+    """
+    if async_client:
+        from volcenginesdkarkruntime import AsyncArk
+        return AsyncArk
+    from volcenginesdkarkruntime import Ark
+    return Ark
 
 
 def safe_decode_response(content: Any) -> Optional[str]:
-    """安全解码API响应内容"""
+    """安全解码API响应内容
+    
+    每个流式 chunk 都会调用一次。SDK 给出的几乎都是已解码的 str，
+    用 type() is 精确比较类型，先判断它并原样返回。
+    bytes 先按严格模式解码（合法 UTF-8 时最快），只有遇到非法字节才退回替换模式。
+    """
+    if type(content) is str:
+        return content
     if content is None:
         return None
-    
-    try:
-        if isinstance(content, bytes):
+    if isinstance(content, bytes):
+        try:
+            return content.decode('utf-8')
+        except UnicodeDecodeError:
             return content.decode('utf-8', errors='replace')
-        elif isinstance(content, str):
-            return content
-        else:
-            return str(content)
-    except Exception:
-        return str(content) if content else ""
+    if isinstance(content, str):
+        return content
+    return str(content)
+
+
+# ----------------------------------------------------------------------------
+# 流式事件转换：每种需要输出的事件对应一个转换函数，
+# 参数为 SDK 事件和本次回复的 chunk 模板（见 DoubaoClient._new_chunk_base），
+# 返回 chunk 数据字典，无需输出时返回 None
+# 文本增量几乎总是 str，转换函数内先判断类型，省去一次 safe_decode_response 调用
+# ----------------------------------------------------------------------------
+
+def _convert_content(chunk, base: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """回复内容增量"""
+    delta = getattr(chunk, "delta", "")
+    if not delta:
+        return None
+    if type(delta) is not str:
+        delta = safe_decode_response(delta)
+    chunk_data = base.copy()
+    chunk_data['type'] = 'content'
+    chunk_data['content'] = delta
+    return chunk_data
+
+
+def _convert_reasoning(chunk, base: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """深度思考内容增量"""
+    delta = getattr(chunk, "delta", "")
+    if not delta:
+        return None
+    if type(delta) is not str:
+        delta = safe_decode_response(delta)
+    chunk_data = base.copy()
+    chunk_data['type'] = 'reasoning'
+    chunk_data['reasoning'] = delta
+    return chunk_data
+
+
+def _convert_web_search_start(chunk, base: Dict[str, Any]) -> Dict[str, Any]:
+    """联网搜索开始"""
+    chunk_data = base.copy()
+    chunk_data['type'] = 'web_search_start'
+    return chunk_data
+
+
+def _convert_web_search_searching(chunk, base: Dict[str, Any]) -> Dict[str, Any]:
+    """联网搜索中（带搜索关键词）"""
+    chunk_data = base.copy()
+    chunk_data['type'] = 'web_search_searching'
+    chunk_data['search_query'] = getattr(chunk, "query", "")
+    return chunk_data
+
+
+def _convert_web_search_completed(chunk, base: Dict[str, Any]) -> Dict[str, Any]:
+    """联网搜索完成"""
+    chunk_data = base.copy()
+    chunk_data['type'] = 'web_search_completed'
+    return chunk_data
+
+
+# 事件类型 -> 转换函数（同步、异步共用）
+# 一次字典查找即可分派，SDK 的其他大量事件（output_item.added 等）查找失败后直接跳过
+_CHUNK_CONVERTERS = {
+    "response.output_text.delta": _convert_content,
+    "response.reasoning_summary_text.delta": _convert_reasoning,
+    "response.web_search_call.in_progress": _convert_web_search_start,
+    "response.web_search_call.searching": _convert_web_search_searching,
+    "response.web_search_call.completed": _convert_web_search_completed,
+}
 
 
 class DoubaoClient:
@@ -43,8 +395,26 @@ class DoubaoClient:
         """初始化客户端"""
         self._validate_config()
         self._init_client()
+        self._init_request_params()
         self._init_conversation_state()
         self.id_mapper = get_id_mapper()  # 获取ID映射器
+        
+        # 用户输入第一条消息期间，在后台完成 SDK 导入
+        if config.SDK_PRELOAD_ENABLED:
+            threading.Thread(target=self._preload_sdk, name="doubao-preload", daemon=True).start()
+    
+    @staticmethod
+    def _preload_sdk() -> None:
+        """预先导入 SDK（连带 httpx、pydantic 等依赖），第一次请求不必等待导入
+        
+        对话请求使用与事件循环绑定的异步连接池，无法在这里提前建立连接，
+        只做与事件循环无关的导入。导入失败时留给正式请求报告错误，这里静默忽略。
+        """
+        try:
+            _get_ark_cls(async_client=True)
+            _get_ark_cls()
+        except Exception:
+            pass
     
     def _validate_config(self) -> None:
         """验证配置有效性"""
@@ -58,12 +428,72 @@ class DoubaoClient:
             )
     
     def _init_client(self) -> None:
-        """初始化 Ark 客户端"""
+        """准备 Ark 客户端
+        
+        SDK 的导入和客户端的创建推迟到第一次请求（见 client 属性），
+        欢迎界面不必等待 SDK 加载。
+        """
+        self._client: Optional['Ark'] = None
+        self._client_lock = threading.Lock()
+        # 异步客户端只在首次调用 chat_stream_async 时创建，并与当时的事件循环绑定
+        self._async_client: Optional['AsyncArk'] = None
+        self._async_client_loop: Optional[asyncio.AbstractEventLoop] = None
+    
+    def _init_request_params(self) -> None:
+        """构建每次请求都相同的参数，请求时复制一份再填入变化的字段"""
+        self._base_params: Dict[str, Any] = {
+            "model": config.ARK_ENDPOINT_ID,
+            "max_output_tokens": config.MAX_TOKENS,
+            "temperature": config.TEMPERATURE,
+            "top_p": config.TOP_P,
+            "stream": True,
+            "store": True,
+        }
+        # 系统消息逐字节固定（摘要作为单独的消息发送），服务端可以按前缀命中缓存
+        if config.CONTEXT_CACHING_ENABLED:
+            self._base_params["caching"] = _CACHING
+    
+    @property
+    def client(self) -> 'Ark':
+        """同步 Ark 客户端（首次访问时创建，线程安全）"""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = self._create_client()
+        return self._client
+    
+    @staticmethod
+    def _create_client() -> 'Ark':
+        """创建同步 Ark 客户端"""
         try:
-            self.client = Ark(base_url=config.API_BASE_URL, api_key=config.ARK_API_KEY)
+            ark_cls = _get_ark_cls()
+            client_kwargs = {"base_url": config.API_BASE_URL, "api_key": config.ARK_API_KEY}
+            http_client = _get_shared_http_client()
+            if http_client is not None:
+                client_kwargs["http_client"] = http_client
+            return ark_cls(**client_kwargs)
         except Exception as e:
             raise ValueError(f"初始化 Ark 客户端失败: {e}")
     
+    def _get_async_client(self) -> 'AsyncArk':
+        """获取当前事件循环使用的异步 Ark 客户端（懒加载）
+        
+        异步连接不能跨事件循环使用（例如多次调用 asyncio.run），
+        事件循环变化时重新创建。
+        """
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_client_loop is not loop:
+            try:
+                client_kwargs = {"base_url": config.API_BASE_URL, "api_key": config.ARK_API_KEY}
+                http_client = _get_shared_async_http_client()
+                if http_client is not None:
+                    client_kwargs["http_client"] = http_client
+                self._async_client = _get_ark_cls(async_client=True)(**client_kwargs)
+                self._async_client_loop = loop
+            except Exception as e:
+                raise ValueError(f"初始化异步 Ark 客户端失败: {e}")
+        return self._async_client
+    
     def _init_conversation_state(self) -> None:
         """初始化对话状态"""
         self.previous_response_id: Optional[str] = None
@@ -71,11 +501,128 @@ class DoubaoClient:
         self.system_prompt: str = (
             config.GLOBAL_SYSTEM_PROMPT or "你是豆包，是由字节跳动开发的 AI 人工智能助手。"
         )
+        # 系统消息内容固定不变，每次开始新对话时直接复用（内容逐字节一致，也便于服务端复用前缀）
+        self._system_message: Dict[str, str] = {"role": "system", "content": self.system_prompt}
+        # 系统提示的摘要值：计算缓存键时代替上千字的提示全文
+        self._system_prompt_hash: str = hashlib.sha256(
+            self.system_prompt.encode('utf-8')
+        ).hexdigest()
+        # 上下文长度控制：当前上下文链的轮数，以及压缩早期对话得到的摘要
+        self._chain_turns: int = 0
+        self._context_summary: Optional[str] = None
+        # 最近几轮的 (提问, 回复) 原文：压缩上下文后与摘要一起发送，保留刚刚聊到的内容
+        self._recent_turns: deque = deque(maxlen=max(config.CONTEXT_KEEP_TURNS, 0))
+        # 上一轮的提问和完整回复，用于识别连续重复发送的同一条消息
+        self._last_reply: Optional[Dict[str, Any]] = None
+        # 最近一次请求是否只是重复了上一条回复（调用方据此跳过保存历史记录）
+        self.last_request_replayed: bool = False
+        # 当前上下文链是从会话文件恢复的、且还没有成功请求过
+        self._session_restored: bool = False
+        
+        # 继续上次退出前的对话
+        self._restore_session()
+    
+    def _restore_session(self) -> None:
+        """从会话文件恢复上下文链
+        
+        系统提示或模型接入点变化后，旧的上下文链不再适用，忽略保存的状态；
+        保存时间超过 SESSION_MAX_AGE 的会话在服务端可能已经过期，直接删除。
+        """
+        if not config.SESSION_PERSIST_ENABLED:
+            return
+        
+        try:
+            with open(config.SESSION_FILE, 'r', encoding='utf-8') as f:
+                session = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            print(f"读取会话状态失败: {e}")
+            return
+        
+        if not _is_valid_session(session):
+            print("会话状态文件格式不正确，已忽略")
+            self._delete_session()
+            return
+        
+        if (session.get('system_prompt_hash') != self._system_prompt_hash
+                or session.get('model') != config.ARK_ENDPOINT_ID):
+            return
+        
+        saved_at = session.get('saved_at')
+        if config.SESSION_MAX_AGE > 0 and (
+                not isinstance(saved_at, (int, float))
+                or time.time() - saved_at > config.SESSION_MAX_AGE):
+            self._delete_session()
+            return
+        
+        self.previous_response_id = session.get('previous_response_id')
+        self.conversation_count = session.get('conversation_count') or 0
+        self._chain_turns = session.get('chain_turns') or 0
+        self._context_summary = session.get('context_summary')
+        self._recent_turns.extend(tuple(turn) for turn in session.get('recent_turns') or ())
+        self._session_restored = self.previous_response_id is not None
+    
+    def _save_session(self) -> None:
+        """保存当前上下文链（先写临时文件再替换，避免中途退出留下不完整的文件）"""
+        if not config.SESSION_PERSIST_ENABLED:
+            return
+        
+        session = {
+            'model': config.ARK_ENDPOINT_ID,
+            'system_prompt_hash': self._system_prompt_hash,
+            'previous_response_id': self.previous_response_id,
+            'conversation_count': self.conversation_count,
+            'chain_turns': self._chain_turns,
+            'context_summary': self._context_summary,
+            'recent_turns': list(self._recent_turns),
+            'saved_at': time.time(),
+        }
+        tmp_file = f"{config.SESSION_FILE}.tmp"
+        try:
+            os.makedirs(os.path.dirname(config.SESSION_FILE) or '.', exist_ok=True)
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(session, f, ensure_ascii=False)
+            os.replace(tmp_file, config.SESSION_FILE)
+        except OSError as e:
+            print(f"保存会话状态失败: {e}")
+    
+    def _delete_session(self) -> None:
+        """删除会话文件"""
+        try:
+            os.remove(config.SESSION_FILE)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"删除会话状态失败: {e}")
+    
+    def _is_stale_session_error(self, error: Exception) -> bool:
+        """请求失败是否因为恢复的上下文链已在服务端失效
+        
+        只在恢复后的第一次请求中判断，并且错误必须指向 previous_response_id：
+        内容审核、参数不支持等同样返回 400，那时上下文链仍然有效，不能丢弃。
+        """
+        if not self._session_restored or getattr(error, 'status_code', None) not in (400, 404):
+            return False
+        details = ' '.join(
+            str(getattr(error, name, None) or '') for name in ('code', 'param', 'message')
+        )
+        return 'previous_response_id' in details
+    
+    def _discard_restored_session(self, error: Exception) -> None:
+        """丢弃已失效的恢复会话，之后以新对话重新发送"""
+        print(f"上次的对话已失效，将以新对话重新发送: {error}")
+        self.clear_history()
     
     def clear_history(self) -> None:
         """清空对话历史"""
         self.previous_response_id = None
         self.conversation_count = 0
+        self._chain_turns = 0
+        self._context_summary = None
+        self._recent_turns.clear()
+        self._session_restored = False
+        self._delete_session()
     
     def set_response_id(self, short_id: str) -> None:
         """设置response_id，用于从指定对话点继续
@@ -87,22 +634,48 @@ class DoubaoClient:
         long_id = self.id_mapper.get_long_id(short_id)
         if long_id:
             self.previous_response_id = long_id
+            # 切换到另一条上下文链，之前的摘要和最近几轮记录不再适用
+            self._chain_turns = 0
+            self._context_summary = None
+            self._recent_turns.clear()
+            self._session_restored = False
+            self._save_session()
         # 注意：这里不重置 conversation_count，因为我们是在继续之前的对话
     
     def get_conversation_length(self) -> int:
         """获取对话消息数量"""
         return self.conversation_count * 2
     
+    def chat(self, message: str, thinking_mode: str = "auto") -> Optional[str]:
+        """发送聊天消息并返回完整回复（供不需要流式显示的调用方使用）
+        
+        Args:
+            message: 用户消息
+            thinking_mode: 思考模式 ('auto', 'enabled', 'disabled')
+        
+        Returns:
+            完整回复内容（不含深度思考部分），请求失败返回 None
+        """
+        parts = []
+        for chunk_data in self.chat_stream(message, thinking_mode):
+            if chunk_data is None:
+                return None
+            if chunk_data['type'] == 'content':
+                parts.append(chunk_data['content'])
+        return ''.join(parts)
+    
     def chat_stream(
         self,
         message: str,
-        thinking_mode: str = "auto"
+        thinking_mode: str = "auto",
+        coalesce_ms: Optional[int] = None
     ) -> Iterator[Optional[Dict[str, Any]]]:
         """发送聊天消息并获取流式回复
         
         Args:
             message: 用户消息
             thinking_mode: 思考模式 ('auto', 'enabled', 'disabled')
+            coalesce_ms: 合并多少毫秒内连续到达的文本增量，默认取 config.STREAM_COALESCE_MS
         
         Yields:
             包含回复内容的字典，可能的类型：
@@ -111,19 +684,128 @@ class DoubaoClient:
             - web_search_*: 联网搜索事件
         """
         try:
-            # 构建输入消息
-            input_messages = self._build_input_messages(message)
+            replay, create_params, cache_key = self._prepare_request(message, thinking_mode)
+            if replay is not None:
+                yield from replay
+                return
+            assert create_params is not None  # 没有可重放的回复时必定需要请求
             
-            # 构建请求参数
-            create_params = self._build_request_params(
-                input_messages,
-                thinking_mode
+            # 发送请求并处理流式响应
+            try:
+                response = self.client.responses.create(
+                    **create_params,
+                    extra_headers=_STREAM_HEADERS
+                )
+            except Exception as e:
+                if not self._is_stale_session_error(e):
+                    raise
+                # 恢复的上下文链已失效：丢弃后以新对话重试一次
+                self._discard_restored_session(e)
+                yield from self.chat_stream(message, thinking_mode, coalesce_ms)
+                return
+            if coalesce_ms is None:
+                coalesce_ms = config.STREAM_COALESCE_MS
+            yield from _coalesce_deltas(
+                self._process_stream_response(response, message, thinking_mode, cache_key),
+                coalesce_ms
             )
+        
+        except Exception as e:
+            print(f"流式聊天请求失败: {e}")
+            yield None
+    
+    def _prepare_request(
+        self,
+        message: str,
+        thinking_mode: str
+    ) -> Tuple[Optional[Iterator[Dict[str, Any]]], Optional[dict], Optional[str]]:
+        """发起流式请求前的准备（同步和异步接口共用）
+        
+        Returns:
+            (replay, create_params, cache_key)：replay 不为 None 时无需请求，
+            直接输出其中的 chunk；否则用 create_params 发起请求
+        """
+        # 连续重复发送同一条消息（如误按两次回车）时直接重复上一条回复
+        last_reply = self._match_last_reply(message, thinking_mode)
+        self.last_request_replayed = last_reply is not None
+        if last_reply is not None:
+            return self._replay_cached(last_reply, thinking_mode, finish=False), None, None
+        
+        # 上下文过长时先压缩为摘要
+        self._maybe_compact_context()
+        
+        # 构建输入消息
+        input_messages = self._build_input_messages(message)
+        
+        # 构建请求参数
+        create_params = self._build_request_params(
+            input_messages,
+            thinking_mode
+        )
+        
+        # 完全相同的请求直接复用缓存的回复
+        cache_key = self._get_cache_key(create_params)
+        cached = self._lookup_cache(cache_key)
+        if cached is not None:
+            self._remember_reply(message, thinking_mode, cached)
+            return self._replay_cached(cached, thinking_mode), None, None
+        
+        return None, create_params, cache_key
+    
+    async def chat_stream_async(
+        self,
+        message: str,
+        thinking_mode: str = "auto",
+        coalesce_ms: Optional[int] = None
+    ) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """chat_stream 的 asyncio 版本
+        
+        使用 AsyncArk 发起请求，通过 async for 逐块读取，
+        等待网络数据时不占用解释器。产出的数据与 chat_stream 完全相同。
+        
+        Args:
+            message: 用户消息
+            thinking_mode: 思考模式 ('auto', 'enabled', 'disabled')
+            coalesce_ms: 合并多少毫秒内连续到达的文本增量，默认取 config.STREAM_COALESCE_MS
+        
+        Yields:
+            包含回复内容的字典，类型同 chat_stream
+        """
+        try:
+            # 摘要请求使用同步客户端，先放到线程池中执行，不阻塞事件循环；
+            # 之后 _prepare_request 中的压缩检查不会再触发
+            if self._compaction_due() and self._match_last_reply(message, thinking_mode) is None:
+                loop = asyncio.get_running_loop()
+                await loop.run_in_executor(None, self._maybe_compact_context)
             
-            # 发送请求并处理流式响应
-            response = self.client.responses.create(**create_params)
-            yield from self._process_stream_response(response, thinking_mode)
+            replay, create_params, cache_key = self._prepare_request(message, thinking_mode)
+            if replay is not None:
+                for chunk_data in replay:
+                    yield chunk_data
+                return
+            assert create_params is not None  # 没有可重放的回复时必定需要请求
+            
+            try:
+                response = await self._get_async_client().responses.create(
+                    **create_params,
+                    extra_headers=_STREAM_HEADERS
+                )
+            except Exception as e:
+                if not self._is_stale_session_error(e):
+                    raise
+                self._discard_restored_session(e)
+                async for retried in self.chat_stream_async(message, thinking_mode, coalesce_ms):
+                    yield retried
+                return
             
+            if coalesce_ms is None:
+                coalesce_ms = config.STREAM_COALESCE_MS
+            async for chunk_data in _coalesce_deltas_async(
+                self._process_stream_response_async(response, message, thinking_mode, cache_key),
+                coalesce_ms
+            ):
+                yield chunk_data
+        
         except Exception as e:
             print(f"流式聊天请求失败: {e}")
             yield None
@@ -132,8 +814,20 @@ class DoubaoClient:
         """构建输入消息列表"""
         if self.previous_response_id is None:
             # 首次对话：包含system和user消息
+            if self._context_summary:
+                # 之前对话的摘要单独作为第二条系统消息，系统提示本身保持逐字节不变，
+                # 压缩上下文后仍能命中服务端的前缀缓存；最近几轮原样附在摘要之后
+                messages = [
+                    self._system_message,
+                    {"role": "system", "content": f"## 之前对话的摘要\n{self._context_summary}"},
+                ]
+                for user_text, reply_text in self._recent_turns:
+                    messages.append({"role": "user", "content": user_text})
+                    messages.append({"role": "assistant", "content": reply_text})
+                messages.append({"role": "user", "content": message})
+                return messages
             return [
-                {"role": "system", "content": self.system_prompt},
+                self._system_message,
                 {"role": "user", "content": message}
             ]
         else:
@@ -146,81 +840,281 @@ class DoubaoClient:
         thinking_mode: str
     ) -> dict:
         """构建API请求参数"""
-        return {
-            "model": config.ARK_ENDPOINT_ID,
-            "input": input_messages,
-            "previous_response_id": self.previous_response_id,
-            "max_output_tokens": config.MAX_TOKENS,
-            "temperature": config.TEMPERATURE,
-            "top_p": config.TOP_P,
-            "tools": [config.WEB_SEARCH_CONFIG],
-            "stream": True,
-            "store": True,
-            "thinking": {"type": thinking_mode}
-        }
+        params = self._base_params.copy()
+        params["input"] = input_messages
+        params["previous_response_id"] = self.previous_response_id
+        params["thinking"] = _THINKING.get(thinking_mode) or {"type": thinking_mode}
+        # 明显无需联网的请求不附带联网搜索工具
+        if _needs_web_search(input_messages[-1]["content"]):
+            params["tools"] = _WEB_SEARCH_TOOLS
+        return params
     
     def _process_stream_response(
         self,
         response,
-        thinking_mode: str
-    ) -> Iterator[Optional[Dict[str, Any]]]:
-        """处理流式响应"""
+        message: str,
+        thinking_mode: str,
+        cache_key: Optional[str] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """处理流式响应
+        
+        同时收集完整回复：正常结束后记为上一轮回复，cache_key 不为空时还会写入缓存。
+        """
         response_id = None
+        base = self._new_chunk_base(thinking_mode, None)
+        collected = self._new_collector()
+        
+        # 循环每个 token 执行一次，转换表和方法先绑定到局部变量，省去逐次的全局和属性查找
+        converters = _CHUNK_CONVERTERS
+        collect = self._collect_chunk
         
         for chunk in response:
             chunk_type = getattr(chunk, "type", "")
+            converter = converters.get(chunk_type)
+            if converter is None:
+                # 获取response_id，之后的chunk都带上它；其他无需输出的事件直接跳过
+                if chunk_type == "response.created":
+                    response_id = self._extract_response_id(chunk)
+                    base = self._new_chunk_base(thinking_mode, response_id)
+                continue
             
-            # 获取response_id
-            if chunk_type == "response.created":
-                if hasattr(chunk, "response") and hasattr(chunk.response, "id"):
-                    response_id = chunk.response.id
-            
-            # 处理Web Search事件
-            elif chunk_type == "response.web_search_call.in_progress":
-                yield self._create_chunk_data('web_search_start', thinking_mode, response_id=response_id)
-            
-            elif chunk_type == "response.web_search_call.searching":
-                search_query = getattr(chunk, "query", "")
-                yield self._create_chunk_data('web_search_searching', thinking_mode, search_query=search_query, response_id=response_id)
-            
-            elif chunk_type == "response.web_search_call.completed":
-                yield self._create_chunk_data('web_search_completed', thinking_mode, response_id=response_id)
-            
-            # 处理思考内容
-            elif chunk_type == "response.reasoning_summary_text.delta":
-                delta = getattr(chunk, "delta", "")
-                if delta:
-                    safe_reasoning = safe_decode_response(delta)
-                    yield self._create_chunk_data('reasoning', thinking_mode, reasoning=safe_reasoning, response_id=response_id)
-            
-            # 处理回复内容
-            elif chunk_type == "response.output_text.delta":
-                delta = getattr(chunk, "delta", "")
-                if delta:
-                    safe_content = safe_decode_response(delta)
-                    yield self._create_chunk_data('content', thinking_mode, content=safe_content, response_id=response_id)
-        
-        # 更新对话状态
+            chunk_data = converter(chunk, base)
+            if chunk_data is not None:
+                collect(collected, chunk_data)
+                yield chunk_data
+        
+        self._finish_response(response_id)
+        self._finish_collect(message, thinking_mode, cache_key, response_id, collected)
+    
+    async def _process_stream_response_async(
+        self,
+        response,
+        message: str,
+        thinking_mode: str,
+        cache_key: Optional[str] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """_process_stream_response 的异步版本"""
+        response_id = None
+        base = self._new_chunk_base(thinking_mode, None)
+        collected = self._new_collector()
+        converters = _CHUNK_CONVERTERS
+        collect = self._collect_chunk
+        
+        async for chunk in response:
+            chunk_type = getattr(chunk, "type", "")
+            converter = converters.get(chunk_type)
+            if converter is None:
+                if chunk_type == "response.created":
+                    response_id = self._extract_response_id(chunk)
+                    base = self._new_chunk_base(thinking_mode, response_id)
+                continue
+            chunk_data = converter(chunk, base)
+            if chunk_data is not None:
+                collect(collected, chunk_data)
+                yield chunk_data
+        
+        self._finish_response(response_id)
+        self._finish_collect(message, thinking_mode, cache_key, response_id, collected)
+    
+    @staticmethod
+    def _extract_response_id(chunk) -> Optional[str]:
+        """从 response.created 事件中取出 response_id"""
+        return getattr(getattr(chunk, "response", None), "id", None)
+    
+    @staticmethod
+    def _new_chunk_base(thinking_mode: str, response_id: Optional[str]) -> Dict[str, Any]:
+        """生成本次回复的 chunk 模板
+        
+        thinking_mode 和 response_id 在一次回复中不变，
+        每个 chunk 只需复制模板再填入变化的字段，比逐个传参构造字典更快。
+        """
+        return {
+            'type': None,
+            'content': None,
+            'reasoning': None,
+            'search_query': "",
+            'thinking_mode': thinking_mode,
+            'response_id': response_id
+        }
+    
+    def _finish_response(self, response_id: Optional[str]) -> None:
+        """一次回复结束后更新对话状态"""
         if response_id:
             self.previous_response_id = response_id
+            self._session_restored = False
             self.conversation_count += 1
+            self._chain_turns += 1
+            self._save_session()
+    
+    def _compaction_due(self) -> bool:
+        """当前上下文链是否已达到 CONTEXT_MAX_TURNS 轮、需要压缩"""
+        max_turns = config.CONTEXT_MAX_TURNS
+        return (max_turns > 0 and self.previous_response_id is not None
+                and self._chain_turns >= max_turns)
+    
+    def _maybe_compact_context(self) -> None:
+        """上下文链超过 CONTEXT_MAX_TURNS 轮时，把之前的对话压缩为摘要
+        
+        服务端每轮都会重新处理整条 previous_response_id 链，
+        轮数越多，每次请求的 token 和延迟越大。超过上限后请求一次简短摘要，
+        再以"系统提示 + 摘要 + 最近 CONTEXT_KEEP_TURNS 轮原文"开启新的上下文链，
+        用户正在接着聊的内容不会只剩摘要。摘要失败时保持原链，
+        等下一个周期再尝试。
+        """
+        if not self._compaction_due():
+            return
+        
+        summary = None
+        try:
+            response = self.client.responses.create(
+                model=config.ARK_ENDPOINT_ID,
+                input=[{"role": "user", "content": _SUMMARY_PROMPT}],
+                previous_response_id=self.previous_response_id,
+                max_output_tokens=config.CONTEXT_SUMMARY_MAX_TOKENS,
+                thinking=_THINKING["disabled"],
+                store=False
+            )
+            summary = self._extract_output_text(response)
+        except Exception as e:
+            print(f"生成对话摘要失败: {e}")
+        
+        self._chain_turns = 0
+        if summary:
+            self._context_summary = summary
+            self.previous_response_id = None
+            self._save_session()
     
     @staticmethod
-    def _create_chunk_data(
-        chunk_type: str,
+    def _extract_output_text(response) -> Optional[str]:
+        """取出非流式回复中的文本内容"""
+        text = safe_decode_response(getattr(response, "output_text", None))
+        if text:
+            return text.strip() or None
+        
+        parts: List[str] = []
+        for item in getattr(response, "output", None) or []:
+            if getattr(item, "type", "") != "message":
+                continue
+            for content in getattr(item, "content", None) or []:
+                part = safe_decode_response(getattr(content, "text", None))
+                if part:
+                    parts.append(part)
+        return ''.join(parts).strip() or None
+    
+    def _get_cache_key(self, create_params: dict) -> Optional[str]:
+        """计算请求的缓存键，不应缓存时返回 None
+        
+        未启用回复缓存或附带了联网搜索工具时不缓存：联网得到的回复过一段时间就可能过时。
+        涉及时效信息的提问总会附带联网搜索工具（见 _needs_web_search），同样不会缓存。
+        输入中是固定的系统消息时，用预先算好的摘要值代替全文参与计算，
+        不必每次都规范化整段系统提示。
+        """
+        if not config.RESPONSE_CACHE_ENABLED or create_params.get("tools"):
+            return None
+        input_messages = create_params["input"]
+        if input_messages and input_messages[0] is self._system_message:
+            key_params = dict(create_params)
+            key_params["input"] = [
+                {"role": "system", "content_sha256": self._system_prompt_hash}
+            ] + input_messages[1:]
+            return ResponseCache.make_key(key_params)
+        return ResponseCache.make_key(create_params)
+    
+    @staticmethod
+    def _lookup_cache(cache_key: Optional[str]) -> Optional[Dict[str, str]]:
+        """查询回复缓存"""
+        if cache_key is None:
+            return None
+        return get_response_cache().get(cache_key)
+    
+    def _replay_cached(
+        self,
+        cached: Dict[str, str],
         thinking_mode: str,
-        content: Optional[str] = None,
-        reasoning: Optional[str] = None,
-        search_query: str = "",
-        response_id: Optional[str] = None
-    ) -> Dict[str, Any]:
-        """创建chunk数据字典"""
-        return {
-            'type': chunk_type,
-            'content': content,
-            'reasoning': reasoning,
-            'search_query': search_query,
+        finish: bool = True
+    ) -> Iterator[Dict[str, Any]]:
+        """把缓存的回复按流式 chunk 的格式输出，并沿用原 response_id 继续对话
+        
+        finish 为 False 时只输出内容，不计为新的一轮（用于重复发送的消息）。
+        """
+        response_id = cached['response_id']
+        base = self._new_chunk_base(thinking_mode, response_id)
+        
+        if cached['reasoning']:
+            chunk_data = base.copy()
+            chunk_data['type'] = 'reasoning'
+            chunk_data['reasoning'] = cached['reasoning']
+            yield chunk_data
+        
+        chunk_data = base.copy()
+        chunk_data['type'] = 'content'
+        chunk_data['content'] = cached['content']
+        yield chunk_data
+        
+        if finish:
+            self._finish_response(response_id)
+    
+    def _match_last_reply(self, message: str, thinking_mode: str) -> Optional[Dict[str, Any]]:
+        """判断是否在上一轮回复结束后 DUPLICATE_REPLAY_WINDOW 秒内重复发送了同一条消息
+        
+        Returns:
+            上一轮的回复，未开启该功能或不是重复发送时返回 None
+        """
+        last_reply = self._last_reply
+        if (not config.DUPLICATE_REPLAY_ENABLED
+                or last_reply is None
+                or time.monotonic() - last_reply['replied_at'] > config.DUPLICATE_REPLAY_WINDOW
+                or last_reply['response_id'] != self.previous_response_id
+                or last_reply['message'] != message
+                or last_reply['thinking_mode'] != thinking_mode):
+            return None
+        return last_reply
+    
+    def _remember_reply(self, message: str, thinking_mode: str, reply: Dict[str, str]) -> None:
+        """记下本轮的提问和完整回复（也计入压缩上下文时原样保留的最近几轮）"""
+        self._recent_turns.append((message, reply['content']))
+        self._last_reply = {
+            'message': message,
             'thinking_mode': thinking_mode,
-            'response_id': response_id
+            'response_id': reply['response_id'],
+            'content': reply['content'],
+            'reasoning': reply['reasoning'],
+            'replied_at': time.monotonic(),
         }
-
+    
+    @staticmethod
+    def _new_collector() -> Dict[str, list]:
+        """创建回复收集器"""
+        return {'content': [], 'reasoning': []}
+    
+    @staticmethod
+    def _collect_chunk(collected: Dict[str, list], chunk_data: Dict[str, Any]) -> None:
+        """收集回复和思考内容"""
+        chunk_type = chunk_data['type']
+        if chunk_type in collected:
+            collected[chunk_type].append(chunk_data[chunk_type])
+    
+    def _finish_collect(
+        self,
+        message: str,
+        thinking_mode: str,
+        cache_key: Optional[str],
+        response_id: Optional[str],
+        collected: Dict[str, list]
+    ) -> None:
+        """回复正常结束后记为上一轮回复，并写入缓存（没有内容的回复都不记录）"""
+        if not response_id or not collected['content']:
+            return
+        reply = {
+            'response_id': response_id,
+            'content': ''.join(collected['content']),
+            'reasoning': ''.join(collected['reasoning']),
+        }
+        self._remember_reply(message, thinking_mode, reply)
+        if cache_key is not None:
+            get_response_cache().put(
+                cache_key,
+                response_id,
+                reply['content'],
+                reply['reasoning']
+            )
@@ -15,13 +15,27 @@ from .config import SYMBOLS, DEFAULT_THINKING_MODE
 
 
 class CommandResult:
-    """命令执行结果封装类"""
+    """命令执行结果封装类
+    
+    使用 __slots__ 固定属性，调用方直接按属性访问（如 result.type）；
+    命令特有的附加数据（如 history_turns）放在 extra 中。
+    """
+    
+    __slots__ = (
+        'type',
+        'message',
+        'response',
+        'thinking_mode',
+        'thinking_status',
+        'target_response_id',
+        'extra',
+    )
     
     def __init__(
         self,
         cmd_type: str,
         message: str = "",
-        response: Optional[str] = None,
+        response: str = "",
         thinking_mode: str = DEFAULT_THINKING_MODE,
         thinking_status: str = "",
         target_response_id: Optional[str] = None,
@@ -97,35 +111,13 @@ class CommandHandler:
         if not user_input.startswith('#'):
             return CommandResult('chat', message=user_input)
         
-        # 解析命令和内容
-        parts = user_input[1:].split(' ', 1)
-        command = parts[0].lower()
-        message = parts[1] if len(parts) > 1 else ''
+        # 解析命令和内容（只对命令名转小写）；内容在这里统一去除首尾空白，
+        # 各处理函数直接判断是否为空
+        command, _, message = user_input[1:].partition(' ')
+        message = message.strip()
         
         # 路由到具体的命令处理器
-        handler_map = {
-            'exit': CommandHandler._handle_exit,
-            'quit': CommandHandler._handle_exit,
-            '退出': CommandHandler._handle_exit,
-            '再见': CommandHandler._handle_exit,
-            'clear': CommandHandler._handle_clear,
-            'new': CommandHandler._handle_clear,
-            '新话题': CommandHandler._handle_clear,
-            'think': CommandHandler._handle_think,
-            'fast': CommandHandler._handle_fast,
-            'chat': CommandHandler._handle_continue,
-            'continue': CommandHandler._handle_continue,
-            'c': CommandHandler._handle_continue,
-            '对话': CommandHandler._handle_continue,
-            'history': CommandHandler._handle_history,
-            'h': CommandHandler._handle_history,
-            '历史': CommandHandler._handle_history,
-            'hdel': CommandHandler._handle_delete,
-            'delete': CommandHandler._handle_delete,
-            '删除': CommandHandler._handle_delete,
-        }
-        
-        handler = handler_map.get(command)
+        handler = _COMMAND_HANDLERS.get(command.lower())
         if handler:
             return handler(message)
         
@@ -143,7 +135,7 @@ class CommandHandler:
     @staticmethod
     def _handle_clear(message: str) -> CommandResult:
         """处理清空历史命令"""
-        if not message.strip():
+        if not message:
             return CommandResult(
                 'error',
                 response=f"{SYMBOLS['warning']} 请在命令后输入新的聊天内容"
@@ -158,7 +150,7 @@ class CommandHandler:
     @staticmethod
     def _handle_think(message: str) -> CommandResult:
         """处理深度思考命令"""
-        if not message.strip():
+        if not message:
             return CommandResult(
                 'error',
                 response=f"{SYMBOLS['warning']} 请在命令后输入有效的消息"
@@ -174,7 +166,7 @@ class CommandHandler:
     @staticmethod
     def _handle_fast(message: str) -> CommandResult:
         """处理快速回复命令"""
-        if not message.strip():
+        if not message:
             return CommandResult(
                 'error',
                 response=f"{SYMBOLS['warning']} 请在命令后输入有效的消息"
@@ -191,16 +183,17 @@ class CommandHandler:
     def _handle_continue(message: str) -> CommandResult:
         """处理继续对话命令"""
         # 解析格式：#chat 对话id 消息内容（对话id可以是短id）
-        chat_parts = message.split(' ', 1)
+        # 内容已去除首尾空白，split() 按任意空白切分，各部分无需再 strip
+        chat_parts = message.split(None, 1)
         
-        if len(chat_parts) < 1 or not chat_parts[0].strip():
+        if not chat_parts:
             return CommandResult(
                 'error',
                 response=f"{SYMBOLS['warning']} 命令格式错误！正确格式：#chat 对话id 消息内容"
             )
         
-        target_response_id = chat_parts[0].strip()
-        actual_message = chat_parts[1].strip() if len(chat_parts) > 1 else ''
+        target_response_id = chat_parts[0]
+        actual_message = chat_parts[1] if len(chat_parts) > 1 else ''
         
         if not actual_message:
             return CommandResult(
@@ -219,7 +212,7 @@ class CommandHandler:
     def _handle_history(message: str) -> CommandResult:
         """处理查看历史命令"""
         try:
-            num_turns = int(message) if message.strip().isdigit() else 10
+            num_turns = int(message) if message.isdigit() else 10
             return CommandResult('history', history_turns=num_turns)
         except ValueError:
             return CommandResult(
@@ -230,14 +223,14 @@ class CommandHandler:
     @staticmethod
     def _handle_delete(message: str) -> CommandResult:
         """处理删除历史命令"""
-        if not message.strip():
+        if not message:
             return CommandResult(
                 'error',
                 response=f"{SYMBOLS['warning']} 请指定要删除的轮数！格式：#hdel 数字"
             )
         
         try:
-            num_turns = int(message.strip())
+            num_turns = int(message)
             if num_turns <= 0:
                 return CommandResult(
                     'error',
@@ -252,6 +245,22 @@ class CommandHandler:
             )
 
 
+# 命令名 -> 处理函数，模块加载时构建一次
+_COMMAND_HANDLERS = {
+    name: handler
+    for names, handler in (
+        (('exit', 'quit', '退出', '再见'), CommandHandler._handle_exit),
+        (('clear', 'new', '新话题'), CommandHandler._handle_clear),
+        (('think',), CommandHandler._handle_think),
+        (('fast',), CommandHandler._handle_fast),
+        (('chat', 'continue', 'c', '对话'), CommandHandler._handle_continue),
+        (('history', 'h', '历史'), CommandHandler._handle_history),
+        (('hdel', 'delete', '删除'), CommandHandler._handle_delete),
+    )
+    for name in names
+}
+
+
 def parse_command(user_input: str) -> CommandResult:
     """解析用户命令（向后兼容接口）
     
@@ -10,7 +10,8 @@
 - 联网搜索配置
 """
 
-from typing import Dict
+from types import MappingProxyType
+from typing import Any, Dict, Mapping
 
 # ============================================================================
 # API 配置
@@ -23,6 +24,9 @@ ARK_ENDPOINT_ID: str = ""
 # API 基础 URL
 API_BASE_URL: str = "https://ark.cn-beijing.volces.com/api/v3"
 
+# 启动后在后台预先导入 SDK，用户输入第一条消息时不必再等待导入
+SDK_PRELOAD_ENABLED: bool = True
+
 # ============================================================================
 # 系统提示词
 # ============================================================================
@@ -78,6 +82,10 @@ WEB_SEARCH_CONFIG: Dict = {
     }
 }
 
+# 只变换给定文本的请求（翻译、改写、正则、格式整理，且不涉及时效信息）不附带联网搜索工具，
+# 省去工具描述的输入 token 和可能的搜索耗时
+WEB_SEARCH_SKIP_LOCAL_TASKS: bool = True
+
 # ============================================================================
 # 模型参数
 # ============================================================================
@@ -93,6 +101,23 @@ TOP_P: float = 0.9  # 核采样参数
 # 默认思考模式：'auto'（自动判断）、'enabled'（强制启用）、'disabled'（禁用）
 DEFAULT_THINKING_MODE: str = 'auto'
 
+# ============================================================================
+# 上下文长度配置
+# ============================================================================
+
+CONTEXT_MAX_TURNS: int = 0                     # 同一上下文最多连续的轮数，超过后压缩为摘要（0 表示不压缩）
+CONTEXT_SUMMARY_MAX_TOKENS: int = 300          # 对话摘要的最大长度
+CONTEXT_KEEP_TURNS: int = 2                    # 压缩时原样保留的最近轮数，与摘要一起带入新的上下文
+CONTEXT_CACHING_ENABLED: bool = False          # 请求服务端缓存上下文前缀（系统提示等），需模型接入点支持
+
+# ============================================================================
+# 会话恢复配置
+# ============================================================================
+
+SESSION_PERSIST_ENABLED: bool = True           # 退出后保存当前上下文，下次启动时继续同一对话
+SESSION_FILE: str = "data/session.json"        # 会话状态文件路径
+SESSION_MAX_AGE: int = 72 * 3600               # 会话保存超过该时长（秒）后不再恢复，服务端保存的上下文届时可能已过期
+
 # ============================================================================
 # 电池显示配置
 # ============================================================================
@@ -101,6 +126,7 @@ BATTERY_DISPLAY_ENABLED: bool = True          # 是否启用电池显示
 BATTERY_REFRESH_INTERVAL: int = 10            # 电池基础刷新间隔（秒）
 BATTERY_HIGH_LEVEL_THRESHOLD: int = 40        # 电量充足阈值（%）
 BATTERY_USER_IDLE_THRESHOLD: int = 60         # 用户空闲判定时间（秒）
+BATTERY_EVENT_HEARTBEAT: int = 60             # 收到电源事件通知时的兜底刷新间隔（秒）
 
 # ============================================================================
 # 历史记录配置
@@ -108,14 +134,26 @@ BATTERY_USER_IDLE_THRESHOLD: int = 60         # 用户空闲判定时间（秒
 
 HISTORY_MAX_TURNS: int = 100                   # 最大保存的聊天轮次数
 
+# ============================================================================
+# 回复缓存配置
+# ============================================================================
+
+RESPONSE_CACHE_ENABLED: bool = False           # 是否缓存回复（同一对话位置的相同请求直接复用，重问不会得到新回答）
+RESPONSE_CACHE_TTL: int = 3600                 # 缓存有效期（秒）
+RESPONSE_CACHE_MAX_ENTRIES: int = 200          # 最多缓存的回复条数
+DUPLICATE_REPLAY_ENABLED: bool = False         # 紧接着重复发送同一条消息（如误按两次回车）时直接重复上一条回复
+DUPLICATE_REPLAY_WINDOW: int = 10              # 只有在上一条回复结束后这么多秒内重复发送才算误操作
+
 # ============================================================================
 # UI配置
 # ============================================================================
 
 ENABLE_COLORS: bool = True                     # 是否启用终端颜色
+STREAM_COALESCE_MS: int = 0                    # 合并多少毫秒内连续到达的回复增量后再输出（0 表示逐块输出）
+STREAM_FLUSH_MS: int = 30                      # 流式输出最多延迟多少毫秒刷新终端（0 表示每块立即刷新）
 
-# 颜文字符号配置（TTY/FBTERM 兼容）
-SYMBOLS: Dict[str, str] = {
+# 颜文字符号配置（TTY/FBTERM 兼容），只读映射，运行时不可修改
+SYMBOLS: Mapping[str, Any] = MappingProxyType({
     # 状态相关
     'success': '(◕‿◕)',
     'error': '(╯︵╰)',
@@ -170,10 +208,10 @@ SYMBOLS: Dict[str, str] = {
     'star': '★',
     'star_empty': '☆',
     'music': '♪(๑ᴖ◡ᴖ๑)♪',
-}
+})
 
-# ANSI 颜色代码配置
-COLORS: Dict[str, str] = {
+# ANSI 颜色代码配置，只读映射，运行时不可修改
+COLORS: Mapping[str, str] = MappingProxyType({
     # 重置
     'reset': '\033[0m',
     
@@ -213,6 +251,9 @@ COLORS: Dict[str, str] = {
     'system_error': '\033[31m',
     'separator_line': '\033[36m',
     'cat_art': '\033[37m',
-}
+})
+
+# 光标上移一行并清除该行（重新显示上一行输入时使用）
+CURSOR_UP_CLEAR: str = '\033[1A\033[2K'
 
 
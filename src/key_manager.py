@@ -10,6 +10,8 @@ import os
 from pathlib import Path
 from typing import Optional, Tuple
 
+from .utils.input_handler import read_line
+
 
 class KeyManager:
     """API 密钥管理器"""
@@ -147,7 +149,7 @@ ARK_ENDPOINT_ID = {endpoint_id}
         try:
             # 获取 API 密钥
             print("\n请输入你的 API 密钥 (ARK_API_KEY):")
-            api_key = input("API Key: ").strip()
+            api_key = read_line("API Key: ").strip()
             
             if not api_key:
                 print("❌ API 密钥不能为空！")
@@ -155,7 +157,7 @@ ARK_ENDPOINT_ID = {endpoint_id}
             
             # 获取端点 ID
             print("\n请输入你的端点 ID (ARK_ENDPOINT_ID):")
-            endpoint_id = input("Endpoint ID: ").strip()
+            endpoint_id = read_line("Endpoint ID: ").strip()
             
             if not endpoint_id:
                 print("❌ 端点 ID 不能为空！")
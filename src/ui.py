@@ -9,15 +9,57 @@ UI 模块
 - 等待动画
 """
 
-import threading
-import time
-from typing import Callable
+import asyncio
+import codecs
+import sys
+from typing import Any, Callable, Dict, Optional, Tuple
 
-from .config import COLORS, ENABLE_COLORS, SYMBOLS
+from .config import COLORS, ENABLE_COLORS, STREAM_FLUSH_MS, SYMBOLS
 from .utils.id_mapper import get_id_mapper
 
 
-def colored_print(
+def _detect_stdout_encoding(encoding: Optional[str]) -> str:
+    """取终端输出编码的规范名称（如 'utf-8'、'gbk'）"""
+    try:
+        return codecs.lookup(encoding or 'utf-8').name
+    except LookupError:
+        return 'utf-8'
+
+
+# 输出编码的检测结果：(sys.stdout.encoding 原值, 规范名称, 是否 UTF 编码)。
+# 本模块在 setup_encoding 重新配置终端之前就已导入，不能在导入时确定编码，
+# 打印时发现 sys.stdout.encoding 变化才重新检测一次
+_stdout_encoding_state = (None, 'utf-8', True)
+_RESET = COLORS['reset']
+
+
+def _get_stdout_encoding() -> Tuple[str, bool]:
+    """返回当前终端输出编码的 (规范名称, 是否 UTF 编码)"""
+    global _stdout_encoding_state
+    encoding = getattr(sys.stdout, 'encoding', None)
+    if encoding != _stdout_encoding_state[0]:
+        name = _detect_stdout_encoding(encoding)
+        _stdout_encoding_state = (encoding, name, name.startswith('utf'))
+    return _stdout_encoding_state[1], _stdout_encoding_state[2]
+
+
+def _safe_print(text: str, end: str, flush: bool) -> None:
+    """按终端编码安全打印
+    
+    UTF 编码的终端（绝大多数情况）直接打印，其他编码（如 Windows 的 GBK 控制台）
+    预先替换无法编码的字符，不必每次靠异常兜底。
+    """
+    encoding, is_utf = _get_stdout_encoding()
+    if not is_utf:
+        text = text.encode(encoding, errors='replace').decode(encoding)
+    try:
+        print(text, end=end, flush=flush)
+    except UnicodeEncodeError:
+        ascii_text = ''.join(char if ord(char) < 128 else '?' for char in text)
+        print(ascii_text, end=end, flush=flush)
+
+
+def _colored_print(
     text: str,
     color_key: str = 'reset',
     end: str = '\n',
@@ -31,66 +73,84 @@ def colored_print(
         end: 行尾字符
         flush: 是否立即刷新输出
     """
-    if ENABLE_COLORS and color_key in COLORS:
-        colored_text = f"{COLORS[color_key]}{text}{COLORS['reset']}"
-    else:
-        colored_text = text
-    
-    try:
-        print(colored_text, end=end, flush=flush)
-    except UnicodeEncodeError:
-        try:
-            safe_text = colored_text.encode('gbk', errors='replace').decode('gbk', errors='replace')
-            print(safe_text, end=end, flush=flush)
-        except Exception:
-            ascii_text = ''.join(char if ord(char) < 128 else '?' for char in colored_text)
-            print(ascii_text, end=end, flush=flush)
+    color = COLORS.get(color_key)
+    if color is not None:
+        text = f"{color}{text}{_RESET}"
+    _safe_print(text, end, flush)
 
 
-def print_welcome() -> None:
-    """打印欢迎界面"""
-    colored_print(f"{SYMBOLS['separator']}" * 70, 'separator_line')
-    colored_print(
+def _plain_print(
+    text: str,
+    color_key: str = 'reset',
+    end: str = '\n',
+    flush: bool = False
+) -> None:
+    """不带颜色的安全打印函数（关闭终端颜色时使用，参数同 _colored_print）"""
+    _safe_print(text, end, flush)
+
+
+# 是否启用颜色在启动时确定，直接选定对应的实现，每次打印不再判断
+colored_print = _colored_print if ENABLE_COLORS else _plain_print
+
+
+def _wrap(text: str, color_key: str) -> str:
+    """按颜色键给文本加上颜色代码（关闭颜色时原样返回）"""
+    color = COLORS.get(color_key) if ENABLE_COLORS else None
+    return f"{color}{text}{_RESET}" if color is not None else text
+
+
+# 欢迎界面和使用说明的内容固定不变，启动时一次性拼好带颜色的整段文本，打印时一次输出
+_WELCOME_TEXT = '\n'.join((
+    _wrap(f"{SYMBOLS['separator']}" * 70, 'separator_line'),
+    _wrap(
         f"    {SYMBOLS['star']} 我是制杖但勤劳的豆包AI "
         f"(支持上下文对话 + 深度思考控制) {SYMBOLS['star']}",
         'bright_white'
-    )
-    colored_print(f"{SYMBOLS['separator']}" * 70, 'separator_line')
-    print()
-    
+    ),
+    _wrap(f"{SYMBOLS['separator']}" * 70, 'separator_line'),
+    '',
     # ASCII艺术猫
-    colored_print("      /\\_/\\    QUÉ MIRA BOBO?", 'cat_art')
-    colored_print(" /\\  / o o \\    ﾉ", 'cat_art')
-    colored_print("//\\\\ \\~(*)~/", 'cat_art')
-    colored_print("`  \\/   ^ /", 'cat_art')
-    colored_print("   | \\|| ||", 'cat_art')
-    colored_print("   \\ '|| ||", 'cat_art')
-    colored_print("    \\(()-())", 'cat_art')
-    colored_print(" ~~~~~~~~~~~~~~~", 'cat_art')
+    _wrap("      /\\_/\\    QUÉ MIRA BOBO?", 'cat_art'),
+    _wrap(" /\\  / o o \\    ﾉ", 'cat_art'),
+    _wrap("//\\\\ \\~(*)~/", 'cat_art'),
+    _wrap("`  \\/   ^ /", 'cat_art'),
+    _wrap("   | \\|| ||", 'cat_art'),
+    _wrap("   \\ '|| ||", 'cat_art'),
+    _wrap("    \\(()-())", 'cat_art'),
+    _wrap(" ~~~~~~~~~~~~~~~", 'cat_art'),
+))
+
+_USAGE_TEXT = '\n'.join((
+    _wrap(f"{SYMBOLS['info']} 输入消息开始聊天", 'system_info'),
+    _wrap(f"{SYMBOLS['info']} 命令格式（以 # 开头）：", 'system_info'),
+    #_wrap("   - #exit / #quit / #退出  --关闭程序", 'system_info'), #此命令不暴露给用户
+    _wrap("   - #new / #clear / #新话题 + 内容 --开始新的聊天", 'system_info'),
+    _wrap("   - #chat / #c / #对话 + 对话id + 内容 --从指定对话点继续（对话id在每次回复前显示）", 'system_info'),
+    _wrap("   - #history / #h / #历史 + 轮次  --显示最近N轮对话（默认10轮）", 'system_info'),
+    #_wrap("   - #hdel / #delete / #删除 + 轮数  --删除最近N轮历史记录", 'system_info'), #此命令不暴露给用户
+    _wrap(f"{SYMBOLS['info']} 深度思考控制：", 'system_info'),
+    _wrap("   - 默认：自动判断是否需要深度思考", 'system_info'),
+    _wrap("   - #think + 内容：强制启用深度思考", 'system_info'),
+    _wrap("   - #fast + 内容：禁用深度思考，快速回复", 'system_info'),
+    _wrap(f"{SYMBOLS['separator']}" * 70, 'separator_line'),
+    '',
+))
+
+
+def print_welcome() -> None:
+    """打印欢迎界面"""
+    _safe_print(_WELCOME_TEXT, '\n', False)
 
 
 def print_usage() -> None:
     """打印使用说明"""
-    colored_print(f"{SYMBOLS['info']} 输入消息开始聊天", 'system_info')
-    colored_print(f"{SYMBOLS['info']} 命令格式（以 # 开头）：", 'system_info')
-    #colored_print("   - #exit / #quit / #退出  --关闭程序", 'system_info') #此命令不暴露给用户
-    colored_print("   - #new / #clear / #新话题 + 内容 --开始新的聊天", 'system_info')
-    colored_print("   - #chat / #c / #对话 + 对话id + 内容 --从指定对话点继续（对话id在每次回复前显示）", 'system_info')
-    colored_print("   - #history / #h / #历史 + 轮次  --显示最近N轮对话（默认10轮）", 'system_info')
-    #colored_print("   - #hdel / #delete / #删除 + 轮数  --删除最近N轮历史记录", 'system_info') #此命令不暴露给用户
-    colored_print(f"{SYMBOLS['info']} 深度思考控制：", 'system_info')
-    colored_print("   - 默认：自动判断是否需要深度思考", 'system_info')
-    colored_print("   - #think + 内容：强制启用深度思考", 'system_info')
-    colored_print("   - #fast + 内容：禁用深度思考，快速回复", 'system_info')
-    colored_print(f"{SYMBOLS['separator']}" * 70, 'separator_line')
-    print()
-
-
-def waiting_animation(stop_event: threading.Event) -> None:
-    """显示等待动画
+    _safe_print(_USAGE_TEXT, '\n', False)
+
+
+async def waiting_animation() -> None:
+    """显示等待动画，直到所在的 asyncio 任务被取消
     
-    Args:
-        stop_event: 停止事件
+    清除动画由 WaitingAnimation.stop 负责。
     """
     spinners = SYMBOLS['spinner']
     messages = ["正在连接豆包AI...", "正在思考中...", "正在组织语言...", "马上就好..."]
@@ -99,7 +159,7 @@ def waiting_animation(stop_event: threading.Event) -> None:
     msg_idx = 0
     msg_counter = 0
     
-    while not stop_event.is_set():
+    while True:
         if msg_counter > 0 and msg_counter % 30 == 0:
             msg_idx = (msg_idx + 1) % len(messages)
         
@@ -112,15 +172,37 @@ def waiting_animation(stop_event: threading.Event) -> None:
         
         idx = (idx + 1) % len(spinners)
         msg_counter += 1
-        time.sleep(0.1)
+        await asyncio.sleep(0.1)
+
+
+class WaitingAnimation:
+    """等待动画控制器
     
-    # 清除动画
-    print('\r' + ' ' * 80, end='')
-    if ENABLE_COLORS:
-        colored_prefix = f'{COLORS["bot_text"]}{SYMBOLS["bot"]} 豆包: {COLORS["reset"]}'
-    else:
-        colored_prefix = f'{SYMBOLS["bot"]} 豆包: '
-    print(f'\r{colored_prefix}', end='', flush=True)
+    动画作为 asyncio 任务与流式输出运行在同一线程：取消任务后立即清除动画，
+    不会与输出交错，不需要等待动画线程退出。
+    """
+    
+    def __init__(self):
+        self._task: Optional['asyncio.Task'] = None
+    
+    def start(self) -> None:
+        """开始显示等待动画（需在事件循环中调用）"""
+        self._task = asyncio.ensure_future(waiting_animation())
+    
+    def stop(self) -> None:
+        """停止等待动画并清除，只在第一次调用时生效"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        self._task = None
+        
+        # 清除动画
+        print('\r' + ' ' * 80, end='')
+        if ENABLE_COLORS:
+            colored_prefix = f'{COLORS["bot_text"]}{SYMBOLS["bot"]} 豆包: {COLORS["reset"]}'
+        else:
+            colored_prefix = f'{SYMBOLS["bot"]} 豆包: '
+        print(f'\r{colored_prefix}', end='', flush=True)
 
 
 class StreamOutputHandler:
@@ -133,98 +215,129 @@ class StreamOutputHandler:
     - 短 ID 管理
     """
     
+    __slots__ = (
+        'reasoning_displayed',
+        'content_started',
+        'first_chunk_received',
+        'web_search_displayed',
+        'response_id',
+        'short_id',
+        'bot_reply',
+        'id_mapper',
+        '_flush_handle',
+    )
+    
     def __init__(self):
+        self.bot_reply = []  # 保存AI回复内容（不含思考部分）
+        self.id_mapper = get_id_mapper()  # 获取ID映射器
+        self._flush_handle: Optional[asyncio.TimerHandle] = None  # 待执行的延迟刷新
+        self.reset()
+    
+    def reset(self) -> None:
+        """重置每轮回复的状态，以便同一个处理器在多轮对话中复用
+        
+        上一轮留下的延迟刷新一并取消（先把缓冲的内容刷新出去），
+        不会在下一轮回复中途触发。
+        """
+        self.flush()
         self.reasoning_displayed = False
         self.content_started = False
         self.first_chunk_received = False
         self.web_search_displayed = False
-        self.response_id = None
-        self.short_id = None
-        self.bot_reply = []  # 保存AI回复内容（不含思考部分）
-        self.id_mapper = get_id_mapper()  # 获取ID映射器
+        self.response_id: Optional[str] = None
+        self.short_id: Optional[str] = None
+        self.bot_reply.clear()
     
     def process_chunk(
         self,
-        chunk_data: dict,
-        stop_animation: threading.Event,
+        chunk_data: Optional[Dict[str, Any]],
+        stop_animation: Callable[[], None],
         thinking_status: str
     ) -> None:
         """处理单个chunk数据
         
         Args:
             chunk_data: chunk数据字典
-            stop_animation: 停止动画事件
+            stop_animation: 停止等待动画的回调
             thinking_status: 思考状态标记
         """
         if chunk_data is None:
             return
         
-        # 获取response_id
-        if chunk_data.get('response_id') and not self.response_id:
+        # 获取response_id（拿到后不再查找）
+        if not self.response_id:
             self.response_id = chunk_data.get('response_id')
         
-        chunk_type = chunk_data.get('type')
-        
-        # 处理Web Search事件
-        if chunk_type == 'web_search_start':
-            self._handle_web_search_start(stop_animation)
-        elif chunk_type == 'web_search_searching':
-            self._handle_web_search_searching(chunk_data)
-        elif chunk_type == 'web_search_completed':
-            self._handle_web_search_completed()
-        
-        # 处理深度思考内容
-        elif chunk_type == 'reasoning' and chunk_data.get('reasoning'):
-            self._handle_reasoning(chunk_data, stop_animation, thinking_status)
-        
-        # 处理普通回复内容
-        elif chunk_type == 'content' and chunk_data.get('content'):
-            self._handle_content(chunk_data, stop_animation, thinking_status)
+        # 按 chunk 类型查表分发，每个 chunk 只做一次类型查找
+        handler = _CHUNK_HANDLERS.get(chunk_data['type'])
+        if handler is not None:
+            handler(self, chunk_data, stop_animation, thinking_status)
     
-    def _handle_web_search_start(self, stop_animation: threading.Event) -> None:
+    def _handle_web_search_start(
+        self,
+        chunk_data: dict,
+        stop_animation: Callable[[], None],
+        thinking_status: str
+    ) -> None:
         """处理Web Search开始事件"""
         if not self.first_chunk_received:
-            stop_animation.set()
-            time.sleep(0.15)
+            stop_animation()
             self.first_chunk_received = True
         if not self.web_search_displayed:
             colored_print(f"\n{SYMBOLS['connect']} 正在联网搜索...", 'system_info')
             self.web_search_displayed = True
     
-    def _handle_web_search_searching(self, chunk_data: dict) -> None:
+    def _handle_web_search_searching(
+        self,
+        chunk_data: dict,
+        stop_animation: Callable[[], None],
+        thinking_status: str
+    ) -> None:
         """处理Web Search搜索中事件"""
         search_query = chunk_data.get('search_query', '')
         if search_query:
             colored_print(f"{SYMBOLS['arrow_right']} 搜索关键词: {search_query}", 'system_info')
     
-    def _handle_web_search_completed(self) -> None:
+    def _handle_web_search_completed(
+        self,
+        chunk_data: dict,
+        stop_animation: Callable[[], None],
+        thinking_status: str
+    ) -> None:
         """处理Web Search完成事件"""
         colored_print(f"{SYMBOLS['success']} 联网搜索完成，正在整理答案...", 'system_success')
     
     def _handle_reasoning(
         self,
         chunk_data: dict,
-        stop_animation: threading.Event,
+        stop_animation: Callable[[], None],
         thinking_status: str
     ) -> None:
         """处理深度思考内容"""
+        reasoning = chunk_data.get('reasoning')
+        if not reasoning:
+            return
+        
         if not self.reasoning_displayed:
             if not self.first_chunk_received:
-                stop_animation.set()
-                time.sleep(0.15)
+                stop_animation()
                 self.first_chunk_received = True
             colored_print(f"\n{SYMBOLS['thinking']} 深度思考中...{thinking_status}", 'separator_line')
             colored_print(f"{SYMBOLS['star']} {SYMBOLS['separator'] * 46} {SYMBOLS['star']}", 'separator_line')
             self.reasoning_displayed = True
-        colored_print(chunk_data['reasoning'], 'bot_thinking', end="", flush=True)
+        self._write_stream(reasoning, 'bot_thinking')
     
     def _handle_content(
         self,
         chunk_data: dict,
-        stop_animation: threading.Event,
+        stop_animation: Callable[[], None],
         thinking_status: str
     ) -> None:
         """处理普通回复内容"""
+        content = chunk_data.get('content')
+        if not content:
+            return
+        
         if not self.content_started:
             # 获取短id显示（如果没有则创建）
             short_id = '◉◡◉'
@@ -239,8 +352,7 @@ class StreamOutputHandler:
                     bot_prefix = f"(id:{short_id}) 豆包{thinking_status}: "
                     colored_print(bot_prefix, 'bot_text', end="", flush=True)
             elif not self.first_chunk_received:
-                stop_animation.set()
-                time.sleep(0.15)
+                stop_animation()
                 # 清除等待动画留下的前缀，重新打印带短id的前缀
                 print('\r' + ' ' * 80, end='')
                 bot_prefix = f"(id:{short_id}) 豆包{thinking_status}: "
@@ -253,15 +365,39 @@ class StreamOutputHandler:
             self.content_started = True
         
         if not self.first_chunk_received:
-            stop_animation.set()
-            time.sleep(0.15)
+            stop_animation()
             self.first_chunk_received = True
         
-        content = chunk_data['content']
         self.bot_reply.append(content)  # 保存回复内容
-        colored_print(content, 'bot_text', end="", flush=True)
+        self._write_stream(content, 'bot_text')
     
-    def get_short_id(self) -> str:
+    def _write_stream(self, text: str, color_key: str) -> None:
+        """输出一段流式文本，合并刷新
+        
+        逐块 flush 意味着每个 token 一次系统调用。这里只写入缓冲区，
+        由事件循环在 STREAM_FLUSH_MS 毫秒后统一刷新一次，
+        期间到达的文本一起输出；流中途停顿时已写入的内容也会按时显示。
+        """
+        colored_print(text, color_key, end="")
+        if self._flush_handle is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if loop is None or STREAM_FLUSH_MS <= 0:
+            sys.stdout.flush()
+            return
+        self._flush_handle = loop.call_later(STREAM_FLUSH_MS / 1000, self.flush)
+    
+    def flush(self) -> None:
+        """立即刷新缓冲的流式输出"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        sys.stdout.flush()
+    
+    def get_short_id(self) -> Optional[str]:
         """获取短id"""
         return self.short_id
     
@@ -269,14 +405,24 @@ class StreamOutputHandler:
         """获取完整的bot回复（不含思考部分）"""
         return ''.join(self.bot_reply)
     
-    def finalize(self, stop_animation: threading.Event) -> None:
+    def finalize(self, stop_animation: Callable[[], None]) -> None:
         """完成输出处理"""
+        self.flush()
+        
         if not self.first_chunk_received:
-            stop_animation.set()
-            time.sleep(0.15)
+            stop_animation()
             print('\r' + ' ' * 80, end='')
             print('\r', end='', flush=True)
         
         if self.first_chunk_received:
             print()
 
+
+# chunk 类型 -> 处理方法，模块加载时构建一次
+_CHUNK_HANDLERS = {
+    'web_search_start': StreamOutputHandler._handle_web_search_start,
+    'web_search_searching': StreamOutputHandler._handle_web_search_searching,
+    'web_search_completed': StreamOutputHandler._handle_web_search_completed,
+    'reasoning': StreamOutputHandler._handle_reasoning,
+    'content': StreamOutputHandler._handle_content,
+}
@@ -2,24 +2,30 @@
 """
 工具模块
 
-提供输入处理、电池监控、编码处理、ID映射、历史记录等工具功能。
+提供输入处理、后台调度、电池监控、编码处理、ID映射、历史记录、回复缓存等工具功能。
 """
 
 from .input_handler import InputHandler
+from .scheduler import Scheduler, get_scheduler
 from .battery import BatteryMonitor, DummyBatteryMonitor, get_battery_monitor
 from .encoding import setup_encoding
 from .id_mapper import IDMapper, get_id_mapper
 from .history import ChatHistory, get_chat_history
+from .response_cache import ResponseCache, get_response_cache
 
 __all__ = [
     'InputHandler',
     'BatteryMonitor',
     'DummyBatteryMonitor',
     'get_battery_monitor',
+    'Scheduler',
+    'get_scheduler',
     'setup_encoding',
     'IDMapper',
     'get_id_mapper',
     'ChatHistory',
-    'get_chat_history'
+    'get_chat_history',
+    'ResponseCache',
+    'get_response_cache'
 ]
 
@@ -10,16 +10,46 @@
 
 import os
 import platform
+import socket
+import sys
 import threading
 import time
-from typing import Optional
+from typing import Dict, Optional
 
 from ..config import (
     BATTERY_DISPLAY_ENABLED,
+    BATTERY_EVENT_HEARTBEAT,
     BATTERY_HIGH_LEVEL_THRESHOLD,
     BATTERY_REFRESH_INTERVAL,
     BATTERY_USER_IDLE_THRESHOLD,
+    COLORS,
 )
+from .scheduler import Registration, get_scheduler
+
+# 内核 uevent 广播使用的 netlink 协议号（NETLINK_KOBJECT_UEVENT）
+_NETLINK_KOBJECT_UEVENT = 15
+
+_HAS_PREADV = hasattr(os, 'preadv')
+
+
+def _parse_leading_int(data, length: int) -> int:
+    """解析缓冲区开头的十进制整数（sysfs 数值属性格式为 "57\\n"）
+    
+    Raises:
+        ValueError: 开头不是数字
+    """
+    value = 0
+    digits = 0
+    for i in range(length):
+        byte = data[i]
+        if 0x30 <= byte <= 0x39:
+            value = value * 10 + byte - 0x30
+            digits += 1
+        else:
+            break
+    if not digits:
+        raise ValueError("sysfs 属性不是数字")
+    return value
 
 
 class BatteryMonitor:
@@ -29,67 +59,239 @@ class BatteryMonitor:
     支持自适应刷新间隔以节省能耗。
     """
     
+    # 显示位置与颜色控制码（颜色取自全局配色，类定义时解析一次）
+    CURSOR_POSITION = '\033[1;116H'
+    COLOR_RED = COLORS['red']
+    COLOR_YELLOW = COLORS['yellow']
+    COLOR_GREEN = COLORS['green']
+    COLOR_RESET = COLORS['reset']
+    
+    # 电量 0~100 对应的颜色查找表：<20 红色，<40 黄色，其余绿色
+    _COLOR_LUT = (COLOR_RED,) * 20 + (COLOR_YELLOW,) * 20 + (COLOR_GREEN,) * 61
+    DISPLAY_WIDTH = 9  # Pow[100%]的最大长度
+    REFRESH_DEBOUNCE = 0.05  # refresh_now 的合并窗口（秒）
+    POWER_SUPPLY_DIR = '/sys/class/power_supply'
+    CONSOLE_TERMS = frozenset({'linux', 'fbterm'})  # Linux 控制台下的 TERM 取值
+    
+    # 预编码的画面模板：定位 + 颜色 + 文本 + 复位，生成帧时只做一次 bytes 格式化
+    _FRAME_TEMPLATE = (CURSOR_POSITION + '%s%s' + COLOR_RESET).encode('ascii')
+    _CLEAR_FRAME = (CURSOR_POSITION + ' ' * DISPLAY_WIDTH).encode('ascii')
+    
     def __init__(self):
         self.battery_path: Optional[str] = None
         self.is_desktop: bool = False
+        self._paths: Dict[str, Optional[str]] = {'capacity': None, 'uevent': None}
+        self._cap_fd: Optional[int] = None  # capacity 文件的常驻描述符
+        self._uevent_fd: Optional[int] = None  # 没有 capacity 时改为常驻 uevent
+        self._read_buf = bytearray(16)  # 复用的读取缓冲区
         self.current_level: int = 100
-        self.stop_event = threading.Event()
-        self.display_thread: Optional[threading.Thread] = None
+        self._registration: Optional[Registration] = None  # 调度器中的显示任务
+        self._stop_event = threading.Event()  # 停止显示时打断淡入动画
         self.tty_device: str = "/dev/tty1"
+        self._tty_fd: Optional[int] = None  # 常驻的 TTY 写入描述符
+        
+        # 上一次绘制的画面缓存
+        self._last_frame_key: Optional[tuple] = None
+        self._last_frame: bytes = b""
+        self._frames_cache: Dict[tuple, tuple] = {}  # 各电量的淡入帧
+        self._last_render: float = 0.0  # 上次绘制的时间（monotonic）
+        self._refresh_pending: bool = False
+        
+        # 事件驱动刷新相关（内核 power_supply uevent）
+        self._uevent_sock: Optional[socket.socket] = None
         
         # 自适应刷新相关
         self.last_user_activity_time: float = time.time()
         self.activity_lock = threading.Lock()
         
-        self._find_battery_path()
+        # 电池探测推迟到第一次读取或开始显示时，创建实例不触碰文件系统
+        self._discovered: bool = False
+        self._tty_ok: Optional[bool] = None  # 输出终端是否可用，首次绘制前检测一次
+        
+        # 台式机的显示内容固定不变，初始化时一次生成
+        self._desktop_frame = (self.COLOR_YELLOW, "Pow[100%]".rjust(self.DISPLAY_WIDTH))
+    
+    def _ensure_discovered(self) -> None:
+        """首次使用时查找电池"""
+        if not self._discovered:
+            self._discovered = True
+            self._find_battery_path()
+    
+    def _output_available(self) -> bool:
+        """检测是否运行在 Linux 控制台且 TTY 设备可写（只检测一次）
+        
+        输出被重定向到管道或文件时不绘制，避免无意义的写入；
+        在 X/Wayland 等图形终端里（TERM 不是控制台类型）也不绘制，
+        那里看不到控制台上的电量，写入只会白白产生系统调用。
+        """
+        if self._tty_ok is None:
+            try:
+                interactive = sys.stdout.isatty()
+            except (AttributeError, ValueError):
+                interactive = False
+            self._tty_ok = (
+                interactive
+                and os.environ.get('TERM', '') in self.CONSOLE_TERMS
+                and os.access(self.tty_device, os.W_OK)
+            )
+        return self._tty_ok
     
     def _find_battery_path(self) -> None:
-        """查找电池信息文件路径"""
-        battery_paths = [
-            '/sys/class/power_supply/BAT0',
-            '/sys/class/power_supply/BAT1',
-            '/sys/class/power_supply/Battery',
-            '/proc/acpi/battery/BAT0',
-            '/proc/acpi/battery/BAT1'
-        ]
-        
-        for path in battery_paths:
-            if os.path.exists(path):
-                capacity_files = ['capacity', 'energy_now', 'charge_now']
-                for cap_file in capacity_files:
-                    if os.path.exists(os.path.join(path, cap_file)):
-                        self.battery_path = path
-                        return
+        """查找电池信息文件路径
+        
+        一次 scandir 枚举 power_supply 下的全部设备，以内核报告的 type 为准
+        （不依赖 BAT0、BAT1… 等命名），按名称顺序取第一个带电量属性的系统电池。
+        """
+        try:
+            with os.scandir(self.POWER_SUPPLY_DIR) as entries:
+                names = sorted(
+                    entry.name for entry in entries
+                    if self._is_system_battery(entry.path, entry.name)
+                )
+        except OSError:
+            names = []
+        
+        for name in names:
+            path = os.path.join(self.POWER_SUPPLY_DIR, name)
+            for cap_file in ('capacity', 'energy_now', 'charge_now'):
+                if os.access(os.path.join(path, cap_file), os.F_OK):
+                    self.battery_path = path
+                    self._resolve_paths(path)
+                    self._open_fds()
+                    return
         
         # 如果没有找到电池，判断为台式机
         self.is_desktop = True
         self.current_level = 100
     
+    @staticmethod
+    def _read_attr(path: str, name: str) -> Optional[str]:
+        """读取 power_supply 设备的一个文本属性，不存在时返回 None"""
+        try:
+            with open(os.path.join(path, name), 'r') as f:
+                return f.read().strip()
+        except OSError:
+            return None
+    
+    def _is_system_battery(self, path: str, name: str) -> bool:
+        """判断 power_supply 设备是否为本机电池
+        
+        type 为 Battery 且不是无线鼠标、键盘等外设（scope=Device）的电池；
+        没有 type 属性的旧内核按名称前缀判断。
+        """
+        supply_type = self._read_attr(path, 'type')
+        if supply_type is None:
+            return name.startswith(('BAT', 'Battery'))
+        if supply_type != 'Battery':
+            return False
+        return self._read_attr(path, 'scope') != 'Device'
+    
+    def _resolve_paths(self, battery_path: str) -> None:
+        """一次性解析电池相关文件路径，不存在的记为 None
+        
+        这些文件在开机后不会出现或消失，刷新时只需判断是否为 None，
+        不必每次都 stat 文件系统。
+        """
+        for name in self._paths:
+            file_path = os.path.join(battery_path, name)
+            self._paths[name] = file_path if os.path.exists(file_path) else None
+    
+    def _open_fds(self) -> None:
+        """打开电量来源文件并缓存描述符，后续刷新直接 pread
+        
+        优先 capacity；没有时才需要 uevent（一次读出 now/full 两个值）。
+        """
+        flags = os.O_RDONLY | os.O_CLOEXEC
+        try:
+            if self._paths['capacity'] is not None:
+                self._cap_fd = os.open(self._paths['capacity'], flags)
+            elif self._paths['uevent'] is not None:
+                self._uevent_fd = os.open(self._paths['uevent'], flags)
+        except OSError:
+            pass
+    
+    def _close_fds(self) -> None:
+        """关闭缓存的 sysfs 文件描述符"""
+        for fd in (self._cap_fd, self._uevent_fd):
+            if fd is not None:
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+        self._cap_fd = None
+        self._uevent_fd = None
+    
+    def _single_read_fast(self, fd: int) -> int:
+        """单文件快速路径：对缓存的 capacity 描述符做一次 pread
+        
+        sysfs 属性每次从偏移 0 读取都会拿到最新值，无需重新打开文件。
+        读入复用的缓冲区并直接解析数字，不产生中间字符串。
+        """
+        if _HAS_PREADV:
+            length = os.preadv(fd, [self._read_buf], 0)
+            return _parse_leading_int(self._read_buf, length)
+        data = os.pread(fd, len(self._read_buf), 0)
+        return _parse_leading_int(data, len(data))
+    
     def _read_battery_info(self) -> int:
         """读取电池信息"""
+        self._ensure_discovered()
         if self.is_desktop or not self.battery_path:
             return 100
         
         try:
-            capacity_file = os.path.join(self.battery_path, 'capacity')
-            if os.path.exists(capacity_file):
+            if self._cap_fd is not None:
+                return self._single_read_fast(self._cap_fd)
+            
+            capacity_file = self._paths['capacity']
+            if capacity_file is not None:
                 with open(capacity_file, 'r') as f:
                     return int(f.read().strip())
+            elif self._paths['uevent'] is not None:
+                # 没有 capacity 时需要 now/full 两个值，一次性从 uevent 读取
+                return self._read_level_from_uevent()
             else:
-                # 尝试从energy_now和energy_full计算
-                energy_now_file = os.path.join(self.battery_path, 'energy_now')
-                energy_full_file = os.path.join(self.battery_path, 'energy_full')
-                if os.path.exists(energy_now_file) and os.path.exists(energy_full_file):
-                    with open(energy_now_file, 'r') as f:
-                        energy_now = int(f.read().strip())
-                    with open(energy_full_file, 'r') as f:
-                        energy_full = int(f.read().strip())
-                    return int((energy_now / energy_full) * 100)
-                else:
-                    return 100
-        except (IOError, ValueError, ZeroDivisionError):
+                return 100
+        except (OSError, ValueError, ZeroDivisionError):
             return 100
     
+    def _read_level_from_uevent(self) -> int:
+        """从 uevent 文件一次性读取电量
+        
+        uevent 中以 POWER_SUPPLY_* 形式包含电池的全部属性，
+        一次读取即可拿到 energy_now/energy_full（或 charge_now/charge_full），
+        不必再逐个打开多个 sysfs 文件。有缓存的描述符时直接 pread。
+        
+        Returns:
+            电量百分比，无法计算时返回 100
+        """
+        if self._uevent_fd is not None:
+            # sysfs 属性一次最多返回一页
+            data = os.pread(self._uevent_fd, 4096, 0)
+        else:
+            uevent_path = self._paths['uevent']
+            if uevent_path is None:
+                return 100
+            with open(uevent_path, 'rb') as f:
+                data = f.read()
+        
+        values = {}
+        for line in data.splitlines():
+            key, _, value = line.partition(b'=')
+            values[key] = value
+        
+        capacity = values.get(b'POWER_SUPPLY_CAPACITY')
+        if capacity:
+            return int(capacity)
+        
+        for prefix in (b'POWER_SUPPLY_ENERGY', b'POWER_SUPPLY_CHARGE'):
+            now = values.get(prefix + b'_NOW')
+            full = values.get(prefix + b'_FULL')
+            if now and full:
+                return int((int(now) / int(full)) * 100)
+        
+        return 100
+    
     def get_battery_status(self) -> int:
         """获取电池状态信息"""
         level = self._read_battery_info()
@@ -132,104 +334,222 @@ class BatteryMonitor:
         return refresh_interval
     
     def _get_battery_color(self, level: int) -> str:
-        """根据电量获取TTY颜色"""
-        if level < 20:
-            return '\033[31m'  # 红色
-        elif level < 40:
-            return '\033[33m'  # 黄色
-        else:
-            return '\033[32m'  # 绿色
+        """根据电量获取TTY颜色（查表，超出 0~100 的读数按边界处理）"""
+        if level < 0:
+            level = 0
+        elif level > 100:
+            level = 100
+        return self._COLOR_LUT[level]
     
     def _display_battery_info(self) -> None:
         """在TTY上显示电池信息"""
+        if not self._output_available():
+            return
+        self._last_render = time.monotonic()
         level = self.get_battery_status()
+        frame_key = (level, self.is_desktop)
+        
+        if frame_key == self._last_frame_key:
+            # 内容没变：一次写入上次的完整画面即可，不再重复淡入动画。
+            # 仍需重绘，因为翻页会把显示冲掉（见 README）
+            self._write_tty(self._last_frame)
+            return
+        
+        frames = self._frames_cache.get(frame_key)
+        if frames is None:
+            frames = self._build_frames(level)
+            self._frames_cache[frame_key] = frames
+        
+        # 逐字显示电池信息，实现淡入效果；每一帧都是拼好的 bytes，只产生一次 write 调用
+        last = len(frames) - 1
+        for i, frame in enumerate(frames):
+            if not self._write_tty(frame):
+                return
+            
+            if i < last and self._stop_event.wait(0.1):
+                # 正在停止显示：放弃剩余帧，避免清除后又画出残影
+                return
+        
+        # 最后一帧就是完整画面
+        self._last_frame = frames[-1]
+        self._last_frame_key = frame_key
+    
+    def _write_tty(self, payload: bytes) -> bool:
+        """向 TTY 写入一段数据
         
-        # 准备电池信息文本
+        描述符首次写入时打开并一直保留，之后每次刷新只有一次 write 调用。
+        写入失败（设备被移除等）时关闭描述符，下次写入再重新打开。
+        
+        Returns:
+            是否写入成功
+        """
+        try:
+            if self._tty_fd is None:
+                self._tty_fd = os.open(
+                    self.tty_device,
+                    os.O_WRONLY | os.O_NOCTTY | os.O_CLOEXEC
+                )
+            os.write(self._tty_fd, payload)
+            return True
+        except OSError:
+            self._close_tty()
+            return False
+    
+    def _close_tty(self) -> None:
+        """关闭 TTY 写入描述符"""
+        if self._tty_fd is not None:
+            try:
+                os.close(self._tty_fd)
+            except OSError:
+                pass
+            self._tty_fd = None
+    
+    def _build_frames(self, level: int) -> tuple:
+        """生成某一电量的全部淡入帧（已编码为 bytes）
+        
+        电量取值有限，生成后按 (电量, 是否台式机) 缓存，电量变回时直接复用。
+        """
         if self.is_desktop:
-            battery_text = "Pow[100%]"
-            color = '\033[33m'
+            color, padded_text = self._desktop_frame
         else:
-            battery_text = f"Pow[{level}%]"
             color = self._get_battery_color(level)
+            padded_text = f"Pow[{level}%]".rjust(self.DISPLAY_WIDTH)
         
-        reset_color = '\033[0m'
-        
-        try:
-            with open(self.tty_device, 'w') as tty_file:
-                max_length = 9  # Pow[100%]的最大长度
-                padding_spaces = max_length - len(battery_text)
-                padded_text = " " * padding_spaces + battery_text
-                
-                # 逐字显示电池信息，实现淡入效果
-                for i in range(len(padded_text) + 1):
-                    tty_file.write("\033[1;116H")
-                    current_text = padded_text[:i]
-                    current_display = f"{color}{current_text}{reset_color}"
-                    tty_file.write(current_display)
-                    tty_file.flush()
-                    
-                    if i < len(padded_text):
-                        time.sleep(0.1)
-        except Exception:
-            pass
+        color = color.encode('ascii')
+        text = padded_text.encode('ascii')
+        template = self._FRAME_TEMPLATE
+        return tuple(template % (color, text[:i]) for i in range(len(text) + 1))
     
     def start_display(self) -> None:
         """开始显示电池信息"""
         if not BATTERY_DISPLAY_ENABLED:
             return
         
-        if self.display_thread and self.display_thread.is_alive():
+        if self._registration is not None:
+            return
+        
+        if not self._output_available():
             return
         
-        self.stop_event.clear()
-        self.display_thread = threading.Thread(
-            target=self._display_loop,
-            daemon=True
+        self._stop_event.clear()
+        self._ensure_discovered()
+        self._open_uevent_socket()
+        uevent_fd = self._uevent_sock.fileno() if self._uevent_sock else None
+        self._registration = get_scheduler().register(
+            self._display_tick,
+            BATTERY_REFRESH_INTERVAL,
+            fd=uevent_fd,
+            on_readable=self._drain_uevents
         )
-        self.display_thread.start()
     
     def stop_display(self) -> None:
         """停止显示电池信息"""
-        self.stop_event.set()
-        if self.display_thread:
-            self.display_thread.join(timeout=1)
+        # 先打断进行中的淡入动画，cancel 就不必等它播完
+        self._stop_event.set()
+        if self._registration is not None:
+            self._registration.cancel()
+            self._registration = None
         self.clear_display()
+        self._close_tty()
+        self._close_uevent_socket()
+        self._close_fds()
     
-    def _display_loop(self) -> None:
-        """显示循环（支持自适应刷新间隔）"""
-        while not self.stop_event.is_set():
+    def _open_uevent_socket(self) -> None:
+        """订阅内核 uevent 广播，电池状态变化时才唤醒刷新
+        
+        sysfs 属性文件内容变化时不会产生 inotify 事件，
+        但 power_supply 驱动会通过 netlink 广播 change 事件。
+        订阅失败（非 Linux、无权限等）时保持原有的定时轮询。
+        """
+        if self.is_desktop or self._uevent_sock is not None:
+            return
+        
+        af_netlink = getattr(socket, 'AF_NETLINK', None)
+        if af_netlink is None:
+            return
+        
+        try:
+            sock = socket.socket(af_netlink, socket.SOCK_DGRAM, _NETLINK_KOBJECT_UEVENT)
+            sock.bind((0, 1))  # 组 1：内核发出的 uevent
+            sock.setblocking(False)
+        except OSError:
+            return
+        
+        self._uevent_sock = sock
+    
+    def _close_uevent_socket(self) -> None:
+        """关闭 uevent 订阅"""
+        if self._uevent_sock is not None:
+            self._uevent_sock.close()
+            self._uevent_sock = None
+    
+    def _drain_uevents(self) -> bool:
+        """读取积压的 uevent 消息
+        
+        插拔电源时往往会连续收到多条，一次取完只触发一次重绘。
+        
+        Returns:
+            其中有 power_supply 事件时返回 True
+        """
+        sock = self._uevent_sock
+        if sock is None:
+            return False
+        
+        power_supply_changed = False
+        while True:
             try:
-                # 显示电池信息
-                self._display_battery_info()
-                
-                # 动态计算下次刷新间隔
-                refresh_interval = self._calculate_refresh_interval()
-                
-                # 使用 wait() 而不是 sleep()，这样可以响应 stop_event
-                # 同时避免因刷新间隔变化导致永远到不了下个刷新时间点
-                self.stop_event.wait(timeout=refresh_interval)
-                
-            except Exception:
-                pass
+                message = sock.recv(8192)
+            except (BlockingIOError, InterruptedError):
+                break
+            if b'SUBSYSTEM=power_supply' in message:
+                power_supply_changed = True
+        return power_supply_changed
+    
+    def _display_tick(self) -> float:
+        """调度器回调：刷新显示并返回下次刷新间隔（支持自适应）"""
+        self._display_battery_info()
+        
+        # 动态计算下次刷新间隔
+        refresh_interval = self._calculate_refresh_interval()
+        
+        if self._uevent_sock is not None:
+            # 电量变化由内核事件通知，定时刷新只作为兜底
+            return max(refresh_interval, BATTERY_EVENT_HEARTBEAT)
+        return refresh_interval
     
     def clear_display(self) -> None:
         """清除TTY电池显示"""
+        if not self._output_available():
+            return
+        self._write_tty(self._CLEAR_FRAME)
+    
+    def refresh_now(self) -> None:
+        """请求尽快重绘电池显示（如一段聊天输出冲掉显示之后）
+        
+        绘制交给调度线程执行：淡入动画不阻塞调用方，也不会与定时刷新同时绘制。
+        距上次绘制不足 REFRESH_DEBOUNCE 时推迟到窗口结束，连续的调用合并为一次。
+        未在显示时不做任何事。
+        """
+        if self._registration is None or self._refresh_pending:
+            return
+        
+        self._refresh_pending = True
+        elapsed = time.monotonic() - self._last_render
+        get_scheduler().call_later(
+            max(0.0, self.REFRESH_DEBOUNCE - elapsed),
+            self._flush_pending_refresh
+        )
+    
+    def _flush_pending_refresh(self) -> None:
+        """执行被合并的 refresh_now（在调度线程中）"""
+        self._refresh_pending = False
+        if self._registration is None or self._stop_event.is_set():
+            return
         try:
-            with open(self.tty_device, 'w') as tty_file:
-                tty_file.write("\033[1;116H")
-                tty_file.write(" " * 9)
-                tty_file.flush()
+            self._display_battery_info()
         except Exception:
             pass
     
-    def refresh_now(self) -> None:
-        """立即刷新电池显示"""
-        if BATTERY_DISPLAY_ENABLED:
-            try:
-                self._display_battery_info()
-            except Exception:
-                pass
-    
     def hide_display(self) -> None:
         """隐藏电池显示"""
         if BATTERY_DISPLAY_ENABLED:
@@ -266,10 +586,20 @@ class DummyBatteryMonitor:
         return 100
 
 
+# 全局电池监控器实例
+_global_battery_monitor = None
+
+
 def get_battery_monitor():
-    """获取适合当前系统的电池监控器实例"""
-    if platform.system() == 'Windows':
-        return DummyBatteryMonitor()
-    else:
-        return BatteryMonitor()
+    """获取适合当前系统的全局电池监控器实例
+    
+    首次调用时才创建，电池探测进一步推迟到第一次使用。
+    """
+    global _global_battery_monitor
+    if _global_battery_monitor is None:
+        if platform.system() == 'Windows':
+            _global_battery_monitor = DummyBatteryMonitor()
+        else:
+            _global_battery_monitor = BatteryMonitor()
+    return _global_battery_monitor
 
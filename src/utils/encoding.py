@@ -21,6 +21,11 @@ def setup_encoding() -> bool:
         if hasattr(sys.stdout, 'reconfigure'):
             sys.stdout.reconfigure(encoding='utf-8', errors='replace')
             sys.stderr.reconfigure(encoding='utf-8', errors='replace')
+        # 标准输入按 UTF-8 严格解码：走文本读取的输入路径（Windows 的 input()、
+        # 没有终端文件描述符时的 readline）遇到错误编码会抛出 UnicodeDecodeError，
+        # 由 InputHandler 统一提示，而不是按系统默认编码悄悄解码出乱码
+        if hasattr(sys.stdin, 'reconfigure'):
+            sys.stdin.reconfigure(encoding='utf-8', errors='strict')
         os.environ['PYTHONIOENCODING'] = 'utf-8'
         return True
     except Exception:
@@ -16,6 +16,25 @@ from datetime import datetime
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
+try:
+    import orjson  # 可选依赖，C 实现的 JSON 编解码，速度是标准库的数倍
+except ImportError:
+    orjson = None  # type: ignore[assignment]
+
+
+if orjson is not None:
+    _loads = orjson.loads  # 解析失败抛出的 orjson.JSONDecodeError 是 json.JSONDecodeError 的子类
+    
+    def _dump_line(record: Dict[str, Any]) -> str:
+        """序列化一条记录为 JSONL 行"""
+        return orjson.dumps(record).decode('utf-8') + '\n'
+else:
+    _loads = json.loads
+    
+    def _dump_line(record: Dict[str, Any]) -> str:
+        """序列化一条记录为 JSONL 行"""
+        return json.dumps(record, ensure_ascii=False) + '\n'
+
 
 class ChatHistory:
     """聊天历史管理器
@@ -69,7 +88,7 @@ class ChatHistory:
                         last_line = line
                 
                 if last_line:
-                    record = json.loads(last_line)
+                    record = _loads(last_line)
                     self.current_turn = record.get('turn', 0)
         except Exception as e:
             print(f"读取历史轮次编号失败: {e}")
@@ -142,8 +161,7 @@ class ChatHistory:
         """
         try:
             with open(self.storage_file, 'a', encoding='utf-8') as f:
-                json.dump(record, f, ensure_ascii=False)
-                f.write('\n')
+                f.write(_dump_line(record))
         except Exception as e:
             print(f"保存历史记录失败: {e}")
     
@@ -159,7 +177,7 @@ class ChatHistory:
                 for line in f:
                     if line.strip():
                         try:
-                            records.append(json.loads(line))
+                            records.append(_loads(line))
                         except json.JSONDecodeError:
                             continue
             
@@ -169,9 +187,7 @@ class ChatHistory:
                 
                 # 重写文件
                 with open(self.storage_file, 'w', encoding='utf-8') as f:
-                    for record in records:
-                        json.dump(record, f, ensure_ascii=False)
-                        f.write('\n')
+                    f.writelines(_dump_line(record) for record in records)
         except Exception as e:
             print(f"修剪历史记录失败: {e}")
     
@@ -195,7 +211,7 @@ class ChatHistory:
                 for line in f:
                     if line.strip():
                         try:
-                            records.append(json.loads(line))
+                            records.append(_loads(line))
                         except json.JSONDecodeError:
                             continue
             
@@ -219,7 +235,7 @@ class ChatHistory:
                 for line in f:
                     if line.strip():
                         try:
-                            records.append(json.loads(line))
+                            records.append(_loads(line))
                         except json.JSONDecodeError:
                             continue
             
@@ -246,7 +262,7 @@ class ChatHistory:
             for line in reversed(lines):
                 if line.strip():
                     try:
-                        record = json.loads(line)
+                        record = _loads(line)
                         if record.get('type') == 'chat' and 'response_id' in record:
                             # 返回轮次编号作为计数器
                             # 因为每次chat都会生成一个新id，turn可以作为counter的参考
@@ -286,7 +302,7 @@ class ChatHistory:
                 for line in f:
                     if line.strip():
                         try:
-                            records.append(json.loads(line))
+                            records.append(_loads(line))
                         except json.JSONDecodeError:
                             continue
             
@@ -314,9 +330,7 @@ class ChatHistory:
             
             # 重写文件
             with open(self.storage_file, 'w', encoding='utf-8') as f:
-                for record in remaining_records:
-                    json.dump(record, f, ensure_ascii=False)
-                    f.write('\n')
+                f.writelines(_dump_line(record) for record in remaining_records)
             
             return deleted_count
         except Exception as e:
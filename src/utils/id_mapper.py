@@ -13,6 +13,9 @@ ID 映射模块
 from typing import Dict, Optional
 from collections import OrderedDict
 
+from .. import config
+from .history import get_chat_history
+
 
 class IDMapper:
     """ID 映射器（懒加载版本）
@@ -62,7 +65,8 @@ class IDMapper:
         
         这样不同的API_KEY会产生不同的短id规则，提高安全性。
         """
-        from ..config import ARK_API_KEY
+        # API_KEY 由 key_manager 在启动后写入 config，这里读取运行时的值
+        ARK_API_KEY = config.ARK_API_KEY
         
         # 从API_KEY中提取字符，计算XOR_KEY (12位，范围0-4095)
         # 取前3个字符的ASCII值相加，模4096
@@ -92,9 +96,6 @@ class IDMapper:
         只读取最后一条记录获取 counter，大幅减少启动内存占用。
         """
         try:
-            # 延迟导入避免循环依赖
-            from .history import get_chat_history
-            
             history = get_chat_history()
             
             # 只获取最近1条记录来恢复counter
@@ -129,9 +130,6 @@ class IDMapper:
             对应的长 response_id，如果不存在返回 None
         """
         try:
-            # 延迟导入避免循环依赖
-            from .history import get_chat_history
-            
             history = get_chat_history()
             
             # 遍历所有历史记录查找匹配的短ID
@@ -8,9 +8,14 @@
 - 跨平台支持（Linux/Windows）
 """
 
+import os
 import platform
 import sys
-from typing import Callable, Dict, Optional
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Any, BinaryIO, Callable, Iterator, Mapping, Optional, Tuple
+
+from ..config import CURSOR_UP_CLEAR
 
 # Windows 下禁用 UTF-8 修复功能
 _IS_WINDOWS = platform.system() == 'Windows'
@@ -24,6 +29,84 @@ if not _IS_WINDOWS:
         _IS_WINDOWS = True
 
 
+@lru_cache(maxsize=64)
+def _colorize_prompt(prompt: str, color: str, reset: str) -> str:
+    """拼接彩色提示符（按轮次变化的提示符种类有限，结果缓存复用）"""
+    return color + prompt + reset
+
+
+def _decode_with_repair(data: bytes) -> Tuple[str, str]:
+    """尽量还原一行解码失败的输入，返回 (显示用文本, 清理后文本)
+    
+    依次尝试：
+    1. 按 UTF-8 严格解码；
+    2. 按 UTF-8 无法解码的部分多于能识别的非 ASCII 字符时（多半来自 GBK 编码的终端），
+       按 gb18030（GBK 的超集）严格解码；
+    3. 都失败时按 UTF-8 解码，无法解码的字节替换为 U+FFFD 用于显示，
+       清理后文本去掉这些替换字符。
+    
+    第 2 步只在大部分内容都认不出时尝试：删除汉字残留的半个 UTF-8 字符
+    往往也能被 gb18030 解码成别的汉字，那样得到的是乱码而不是原文。
+    删除单个字符用 str.replace，CPython 中它比 str.translate 快得多。
+    """
+    try:
+        displayed = data.decode('utf-8').rstrip('\n\r')
+        return displayed, displayed.strip()
+    except UnicodeDecodeError:
+        pass
+    
+    replaced = data.decode('utf-8', errors='replace').rstrip('\n\r')
+    invalid = replaced.count('\ufffd')
+    if invalid > sum(1 for char in replaced if char > '\x7f') - invalid:
+        try:
+            displayed = data.decode('gb18030').rstrip('\n\r')
+            return displayed, displayed.strip()
+        except UnicodeDecodeError:
+            pass
+    
+    return replaced, replaced.replace('\ufffd', '').strip()
+
+
+def _stdin_buffer() -> Optional[BinaryIO]:
+    """标准输入的二进制缓冲区（sys.stdin 被替换为没有 buffer 的文本流时为 None）
+    
+    所有按行读取都经过这同一个缓冲区：管道或粘贴的多行输入一次读入后，
+    剩下的行留在缓冲区里，下一次读取（无论由谁发起）都能取到。
+    """
+    return getattr(sys.stdin, 'buffer', None)
+
+
+def read_line(prompt: str = '') -> str:
+    """读取一行输入，替代 input()（密钥配置等 InputHandler 之外的地方使用）
+    
+    与 InputHandler 一样从 sys.stdin.buffer 读取，而不是经过 sys.stdin 的文本缓冲，
+    避免多行输入被一方预读后另一方读不到。输入结束时与 input() 一样抛出 EOFError。
+    """
+    print(prompt, end='', flush=True)
+    buffer = _stdin_buffer()
+    if buffer is None:
+        line = sys.stdin.readline()
+    else:
+        line = buffer.readline().decode('utf-8', errors='replace')
+    if not line:
+        raise EOFError
+    return line.rstrip('\r\n')
+
+
+@contextmanager
+def _raw_mode(fd: int) -> Iterator[None]:
+    """在 with 块内把终端切换为原始模式，退出时恢复原来的设置
+    
+    整个交互只切换、恢复各一次，块内可以连续读取任意多个按键。
+    """
+    old_settings = termios.tcgetattr(fd)
+    try:
+        tty.setraw(fd)
+        yield
+    finally:
+        termios.tcsetattr(fd, termios.TCSADRAIN, old_settings)
+
+
 class InputHandler:
     """输入处理器
     
@@ -40,8 +123,8 @@ class InputHandler:
         self,
         prompt: str,
         print_func: Callable,
-        symbols: Dict[str, str],
-        colors: Dict[str, str],
+        symbols: Mapping[str, Any],
+        colors: Mapping[str, str],
         enable_colors: bool
     ) -> str:
         """获取用户输入
@@ -58,7 +141,7 @@ class InputHandler:
         """
         # 生成彩色提示符
         if enable_colors and 'user_text' in colors:
-            colored_prompt = f"{colors['user_text']}{prompt}{colors['reset']}"
+            colored_prompt = _colorize_prompt(prompt, colors['user_text'], colors['reset'])
         else:
             colored_prompt = prompt
         
@@ -67,18 +150,25 @@ class InputHandler:
         
         # 根据操作系统选择不同的实现
         if _IS_WINDOWS:
-            return self._get_input_windows()
+            return self._get_input_windows(print_func, symbols)
         else:
             return self._get_input_linux(
                 prompt, print_func, symbols, colors, enable_colors
             )
     
     @staticmethod
-    def _get_input_windows() -> str:
-        """Windows 下的输入处理"""
+    def _get_input_windows(print_func: Callable, symbols: Mapping[str, Any]) -> str:
+        """Windows 下的输入处理
+        
+        标准输入按 UTF-8 严格解码（见 setup_encoding），编码不符时提示用户重新输入。
+        """
         try:
             user_input = input()
             return user_input.strip()
+        except UnicodeDecodeError as e:
+            print_func(f"{symbols['warning']} 输入编码错误: {e}", 'system_error')
+            print_func(f"{symbols['info']} 请确认终端使用 UTF-8 编码后重新输入", 'system_info')
+            return ""
         except Exception:
             return ""
     
@@ -86,20 +176,23 @@ class InputHandler:
         self,
         prompt: str,
         print_func: Callable,
-        symbols: Dict[str, str],
-        colors: Dict[str, str],
+        symbols: Mapping[str, Any],
+        colors: Mapping[str, str],
         enable_colors: bool
     ) -> str:
         """Linux 下的输入处理（支持 UTF-8 修复）"""
         try:
-            # 尝试从stdin.buffer读取原始字节
-            if hasattr(sys.stdin, 'buffer'):
-                raw_input = sys.stdin.buffer.readline()
-                user_input = raw_input.decode('utf-8').rstrip('\n\r')
-                return user_input.strip()
+            # 读取原始字节，解码失败时可以尝试修复
+            buffer = _stdin_buffer()
+            if buffer is not None:
+                raw_input = buffer.readline()
+                # 纯 ASCII（命令、英文等常见输入）走 ASCII 解码，省去 UTF-8 校验
+                # strip() 已经会去掉行尾换行，不再单独 rstrip
+                if raw_input.isascii():
+                    return raw_input.decode('ascii').strip()
+                return raw_input.decode('utf-8').strip()
             else:
-                user_input = sys.stdin.readline().rstrip('\n\r')
-                return user_input.strip()
+                return sys.stdin.readline().strip()
         
         except UnicodeDecodeError as e:
             return self._handle_encoding_error(
@@ -118,34 +211,23 @@ class InputHandler:
         raw_input: Optional[bytes],
         prompt: str,
         print_func: Callable,
-        symbols: Dict[str, str],
-        colors: Dict[str, str],
+        symbols: Mapping[str, Any],
+        colors: Mapping[str, str],
         enable_colors: bool
     ) -> str:
         """处理编码错误"""
-        # 向上一行并清除
-        print(f"\033[1A\033[2K", end="")
-        
         # 尝试解码并清理输入
         displayed_input = None
         cleaned_input = None
         
         if raw_input:
-            try:
-                displayed_input = raw_input.decode('utf-8', errors='replace').rstrip('\n\r')
-                cleaned_input = displayed_input.replace('\ufffd', '').strip()
-            except Exception:
-                try:
-                    displayed_input = raw_input.decode('gbk', errors='replace').rstrip('\n\r')
-                    cleaned_input = displayed_input.replace('\ufffd', '').strip()
-                except Exception:
-                    pass
+            displayed_input, cleaned_input = _decode_with_repair(raw_input)
         
-        # 显示错误信息
+        # 向上一行清除原输入，并在同一次输出中显示错误信息
         if displayed_input:
-            print_func(f"{prompt}{displayed_input}", 'system_error')
+            print_func(f"{CURSOR_UP_CLEAR}{prompt}{displayed_input}", 'system_error')
         else:
-            print_func(f"{prompt}[编码错误，输入内容无法显示]", 'system_error')
+            print_func(f"{CURSOR_UP_CLEAR}{prompt}[编码错误，输入内容无法显示]", 'system_error')
         
         print_func(f"{symbols['warning']} 输入编码错误: {error}", 'system_error')
         
@@ -170,7 +252,7 @@ class InputHandler:
         self,
         cleaned_input: str,
         print_func: Callable,
-        symbols: Dict[str, str]
+        symbols: Mapping[str, Any]
     ) -> str:
         """询问用户是否使用清理后的内容"""
         print_func(f"{symbols['info']} 已自动清理错误字符，处理后的内容为:", 'system_info')
@@ -189,7 +271,7 @@ class InputHandler:
             # 如果getch失败，回退到传统方式
             print_func(f"{symbols['info']} (输入 y 确认，其他键取消): ", 'system_info', end='', flush=True)
             try:
-                choice = input().strip().lower()
+                choice = read_line().strip().lower()
                 if choice in ['y', 'yes', '是', '']:
                     print_func(f"{symbols['success']} 使用清理后的内容继续", 'system_success')
                     return cleaned_input
@@ -206,20 +288,18 @@ class InputHandler:
             raise NotImplementedError("getch not available on Windows")
         
         fd = sys.stdin.fileno()
-        old_settings = termios.tcgetattr(fd)
-        try:
-            tty.setraw(sys.stdin.fileno())
-            ch = sys.stdin.read(1)
-            
-            if ch == '\x1b':  # Esc键
-                sys.stdin.read(2)
-                return 'esc'
-            elif ch in ('\r', '\n'):  # Enter键
-                return 'enter'
-            else:
-                return ch
-        finally:
-            termios.tcsetattr(fd, termios.TCSADRAIN, old_settings)
+        with _raw_mode(fd):
+            # 直接读文件描述符，一次取出整个按键序列：
+            # 方向键等是多字节的转义序列，汉字是多字节的 UTF-8；
+            # 单独按 Esc 时只有 1 个字节，也不会像固定再读 2 个字符那样卡住
+            data = os.read(fd, 8)
+        
+        if data.startswith(b'\x1b'):  # Esc键（含方向键等转义序列）
+            return 'esc'
+        elif data[:1] in (b'\r', b'\n'):  # Enter键
+            return 'enter'
+        else:
+            return data.decode('utf-8', errors='replace')[:1]
     
     def reset_tip_flag(self) -> None:
         """重置编码错误提示标志"""
@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""
+回复缓存模块
+
+对完全相同的请求直接复用之前的回复，省去一次网络往返，提供：
+- 基于请求参数 SHA-256 的匹配（字符串只统一 Unicode 组合形式）
+- SQLite 持久化（程序重启后仍然有效）
+- 过期时间（TTL）和 LRU 淘汰
+"""
+
+import hashlib
+import json
+import sqlite3
+import time
+import unicodedata
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from ..config import (
+    RESPONSE_CACHE_MAX_ENTRIES,
+    RESPONSE_CACHE_TTL,
+)
+
+
+def _normalize(value: Any) -> Any:
+    """规范化请求参数，仅用于计算缓存键
+    
+    字符串只统一 Unicode 组合形式（NFC），其余保持原样：
+    大小写、标点和空白都可能改变含义（如代码的缩进、"why?" 与 "why!"）。
+    """
+    if isinstance(value, str):
+        return unicodedata.normalize('NFC', value)
+    if isinstance(value, dict):
+        return {key: _normalize(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(item) for item in value]
+    return value
+
+
+class ResponseCache:
+    """回复缓存
+    
+    功能：
+    - 以请求参数（模型、输入消息、previous_response_id、采样参数、思考模式等）
+      的哈希为键，保存完整回复和对应的 response_id
+    - 命中时直接返回缓存内容，并沿用原 response_id 继续服务端上下文链
+    - 超过有效期的记录视为未命中并删除
+    - 超过最大条数时淘汰最久未使用的记录
+    
+    因为 previous_response_id 也参与计算键，只有在同一对话位置
+    提出完全相同的问题时才会命中（例如 #new 后重复提问）。
+    """
+    
+    def __init__(
+        self,
+        storage_file: str = "data/response_cache.db",
+        max_entries: int = 200,
+        ttl: int = 3600
+    ):
+        """初始化回复缓存
+        
+        Args:
+            storage_file: SQLite 数据库文件路径
+            max_entries: 最多保存的回复条数
+            ttl: 缓存有效期（秒）
+        """
+        self.storage_file = storage_file
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._conn: Optional[sqlite3.Connection] = None  # 首次使用时才打开
+    
+    def _connect(self) -> sqlite3.Connection:
+        """打开数据库并确保表结构存在"""
+        if self._conn is None:
+            Path(self.storage_file).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.storage_file)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY,"
+                " response_id TEXT NOT NULL,"
+                " content TEXT NOT NULL,"
+                " reasoning TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " last_access REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_responses_last_access"
+                " ON responses (last_access)"
+            )
+            self._conn = conn
+        return self._conn
+    
+    @staticmethod
+    def make_key(params: Dict[str, Any]) -> str:
+        """根据请求参数生成缓存键
+        
+        Args:
+            params: 发送给 API 的请求参数
+        
+        Returns:
+            SHA-256 十六进制字符串
+        """
+        payload = json.dumps(
+            _normalize(params),
+            sort_keys=True,
+            ensure_ascii=False,
+            separators=(',', ':')
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def get(self, key: str) -> Optional[Dict[str, str]]:
+        """查询缓存
+        
+        Args:
+            key: 缓存键
+        
+        Returns:
+            包含 response_id、content、reasoning 的字典，未命中或已过期返回 None
+        """
+        try:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT response_id, content, reasoning, created_at"
+                " FROM responses WHERE key = ?",
+                (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            
+            now = time.time()
+            with conn:
+                if now - row[3] > self.ttl:
+                    conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    return None
+                conn.execute(
+                    "UPDATE responses SET last_access = ? WHERE key = ?",
+                    (now, key)
+                )
+            return {'response_id': row[0], 'content': row[1], 'reasoning': row[2]}
+        except sqlite3.Error as e:
+            print(f"读取回复缓存失败: {e}")
+            return None
+    
+    def put(self, key: str, response_id: str, content: str, reasoning: str = "") -> None:
+        """保存一条回复，并清理过期和超出数量的记录
+        
+        Args:
+            key: 缓存键
+            response_id: 回复对应的 response_id
+            content: 回复内容
+            reasoning: 深度思考内容
+        """
+        try:
+            conn = self._connect()
+            now = time.time()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, response_id, content, reasoning, now, now)
+                )
+                conn.execute(
+                    "DELETE FROM responses WHERE created_at < ?",
+                    (now - self.ttl,)
+                )
+                conn.execute(
+                    "DELETE FROM responses WHERE key IN ("
+                    " SELECT key FROM responses"
+                    " ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,)
+                )
+        except sqlite3.Error as e:
+            print(f"保存回复缓存失败: {e}")
+    
+    def clear(self) -> None:
+        """清空所有缓存"""
+        try:
+            conn = self._connect()
+            with conn:
+                conn.execute("DELETE FROM responses")
+        except sqlite3.Error as e:
+            print(f"清空回复缓存失败: {e}")
+
+
+# 全局回复缓存实例
+_global_response_cache: Optional[ResponseCache] = None
+
+
+def get_response_cache() -> ResponseCache:
+    """获取全局回复缓存实例
+    
+    Returns:
+        全局ResponseCache实例
+    """
+    global _global_response_cache
+    if _global_response_cache is None:
+        _global_response_cache = ResponseCache(
+            max_entries=RESPONSE_CACHE_MAX_ENTRIES,
+            ttl=RESPONSE_CACHE_TTL
+        )
+    return _global_response_cache
@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+"""
+后台调度模块
+
+所有需要定时执行的后台任务共用一个守护线程，提供：
+- 周期任务（回调可返回下次间隔，实现自适应刷新）
+- 一次性延迟任务
+- 同时等待文件描述符可读（事件驱动唤醒）
+"""
+
+import heapq
+import itertools
+import os
+import selectors
+import threading
+import time
+from typing import Callable, List, Optional
+
+
+class Registration:
+    """调度器中的一个周期任务，同时充当该任务的停止令牌"""
+    
+    def __init__(
+        self,
+        scheduler: 'Scheduler',
+        callback: Callable[[], Optional[float]],
+        interval: float,
+        fd: Optional[int],
+        on_readable: Optional[Callable[[], bool]],
+        repeat: bool = True
+    ):
+        self._scheduler = scheduler
+        self.callback = callback
+        self.interval = interval
+        self.repeat = repeat
+        self.fd = fd
+        self.on_readable = on_readable
+        self.cancelled = threading.Event()
+        self.run_lock = threading.RLock()  # 回调执行期间持有
+        self.generation = 0  # 重新排期后旧的堆条目随之作废
+        self.triggered = False
+    
+    def trigger(self) -> None:
+        """请求立即执行一次（只置标志并写管道，可在信号处理函数中调用）"""
+        self.triggered = True
+        self._scheduler.wake()
+    
+    def cancel(self, timeout: float = 1.0) -> None:
+        """取消任务，并等待正在执行的回调结束（最多 timeout 秒）"""
+        self.cancelled.set()
+        self._scheduler.unregister(self)
+        if self.run_lock.acquire(timeout=timeout):
+            self.run_lock.release()
+
+
+class Scheduler:
+    """共享的后台调度线程
+    
+    所有周期任务共用一个守护线程：用 heapq 维护下次触发时间，
+    用 selectors 同时等待注册的文件描述符（如 uevent socket）。
+    多个监控器实例不会再各自起一个轮询线程。
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._heap: List[tuple] = []  # (触发时间, 序号, generation, registration)
+        self._seq = itertools.count()
+        self._registrations: set = set()
+        self._pending_fd_ops: List[tuple] = []  # 由调度线程统一执行的 selector 增删
+        self._selector: Optional[selectors.BaseSelector] = None
+        self._wake_pipe: Optional[tuple] = None
+        self._thread: Optional[threading.Thread] = None
+    
+    def register(
+        self,
+        callback: Callable[[], Optional[float]],
+        interval: float,
+        fd: Optional[int] = None,
+        on_readable: Optional[Callable[[], bool]] = None
+    ) -> Registration:
+        """注册周期任务，注册后立即执行第一次
+        
+        Args:
+            callback: 任务回调，返回下次间隔（秒），返回 None 则沿用 interval
+            interval: 默认执行间隔（秒）
+            fd: 需要同时等待的文件描述符
+            on_readable: fd 可读时调用，返回 True 表示立即执行一次任务
+        
+        Returns:
+            任务令牌，用于 trigger() / cancel()
+        """
+        registration = Registration(self, callback, interval, fd, on_readable)
+        with self._lock:
+            self._ensure_thread()
+            self._registrations.add(registration)
+            self._push(registration, time.monotonic())
+            if fd is not None:
+                self._pending_fd_ops.append(('add', registration))
+        self.wake()
+        return registration
+    
+    def unregister(self, registration: Registration) -> None:
+        """移除任务"""
+        with self._lock:
+            if registration not in self._registrations:
+                return
+            self._registrations.discard(registration)
+            if registration.fd is not None:
+                self._pending_fd_ops.append(('remove', registration))
+        self.wake()
+    
+    def wake(self) -> None:
+        """唤醒调度线程重新计算等待时间"""
+        if self._wake_pipe:
+            try:
+                os.write(self._wake_pipe[1], b'x')
+            except OSError:
+                pass
+    
+    def _ensure_thread(self) -> None:
+        """首次注册时创建 selector 和调度线程"""
+        if self._thread is not None:
+            return
+        selector = selectors.DefaultSelector()
+        self._selector = selector
+        self._wake_pipe = os.pipe()
+        for fd in self._wake_pipe:
+            os.set_blocking(fd, False)
+        selector.register(self._wake_pipe[0], selectors.EVENT_READ, None)
+        self._thread = threading.Thread(
+            target=self._run, args=(selector, self._wake_pipe[0]), daemon=True
+        )
+        self._thread.start()
+    
+    def call_later(self, delay: float, callback: Callable[[], None]) -> Registration:
+        """在 delay 秒后执行一次 callback（一次性任务）"""
+        registration = Registration(self, callback, delay, None, None, repeat=False)
+        with self._lock:
+            self._ensure_thread()
+            self._registrations.add(registration)
+            self._push(registration, time.monotonic() + delay)
+        self.wake()
+        return registration
+    
+    def _push(self, registration: Registration, when: float) -> None:
+        registration.generation += 1
+        heapq.heappush(
+            self._heap,
+            (when, next(self._seq), registration.generation, registration)
+        )
+    
+    def _apply_fd_ops(self, selector: selectors.BaseSelector) -> None:
+        for action, registration in self._pending_fd_ops:
+            if action == 'add':
+                selector.register(registration.fd, selectors.EVENT_READ, registration)
+            else:
+                try:
+                    selector.unregister(registration.fd)
+                except (KeyError, ValueError):
+                    pass
+        self._pending_fd_ops.clear()
+    
+    def _run(self, selector: selectors.BaseSelector, wake_fd: int) -> None:
+        """调度循环"""
+        while True:
+            with self._lock:
+                self._apply_fd_ops(selector)
+                if self._heap:
+                    timeout = max(0.0, self._heap[0][0] - time.monotonic())
+                else:
+                    timeout = None
+            
+            for key, _ in selector.select(timeout):
+                registration = key.data
+                if registration is None:
+                    try:
+                        os.read(wake_fd, 512)
+                    except OSError:
+                        pass
+                elif not registration.cancelled.is_set():
+                    try:
+                        if registration.on_readable():
+                            registration.triggered = True
+                    except Exception:
+                        pass
+            
+            now = time.monotonic()
+            due = []
+            with self._lock:
+                for registration in self._registrations:
+                    if registration.triggered:
+                        registration.triggered = False
+                        self._push(registration, now)
+                while self._heap and self._heap[0][0] <= now:
+                    _, _, generation, registration = heapq.heappop(self._heap)
+                    if (registration.generation == generation
+                            and registration in self._registrations):
+                        due.append(registration)
+            
+            for registration in due:
+                self._execute(registration)
+    
+    def _execute(self, registration: Registration) -> None:
+        """执行一次任务回调并安排下次执行"""
+        with registration.run_lock:
+            if registration.cancelled.is_set():
+                return
+            try:
+                next_interval = registration.callback()
+            except Exception:
+                next_interval = None
+        
+        if not registration.repeat:
+            self.unregister(registration)
+            return
+        
+        if next_interval is None:
+            next_interval = registration.interval
+        with self._lock:
+            if registration in self._registrations:
+                self._push(registration, time.monotonic() + next_interval)
+
+
+# 全局调度器实例
+_global_scheduler: Optional[Scheduler] = None
+
+
+def get_scheduler() -> Scheduler:
+    """获取全局调度器实例"""
+    global _global_scheduler
+    if _global_scheduler is None:
+        _global_scheduler = Scheduler()
+    return _global_scheduler
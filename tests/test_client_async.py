@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""异步流式接口的测试（用假的 AsyncArk 代替网络请求）"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from src import config
+from src.client import DoubaoClient
+
+
+def _events(response_id: str) -> list:
+    return [
+        SimpleNamespace(type="response.created", response=SimpleNamespace(id=response_id)),
+        SimpleNamespace(type="response.reasoning_summary_text.delta", delta="想一想"),
+        SimpleNamespace(type="response.output_text.delta", delta="你好"),
+        SimpleNamespace(type="response.output_text.delta", delta=b"\xe4\xb8\x96\xe7\x95\x8c"),
+        SimpleNamespace(type="response.completed"),
+    ]
+
+
+class _FakeAsyncResponses:
+    def __init__(self):
+        self.calls = []
+    
+    async def create(self, **kwargs):
+        self.calls.append(kwargs)
+        events = _events(f"resp_{len(self.calls)}")
+        
+        async def stream():
+            for event in events:
+                yield event
+        return stream()
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    monkeypatch.setattr(config, 'ARK_API_KEY', 'test-key')
+    monkeypatch.setattr(config, 'ARK_ENDPOINT_ID', 'test-endpoint')
+    monkeypatch.setattr(config, 'SDK_PRELOAD_ENABLED', False)
+    monkeypatch.setattr(config, 'RESPONSE_CACHE_ENABLED', False)
+    monkeypatch.setattr(config, 'STREAM_COALESCE_MS', 0)
+    monkeypatch.setattr(config, 'SESSION_FILE', str(tmp_path / 'session.json'))
+    client = DoubaoClient()
+    responses = _FakeAsyncResponses()
+    fake = SimpleNamespace(responses=responses)
+    monkeypatch.setattr(client, '_get_async_client', lambda: fake)
+    return client, responses
+
+
+def _collect(client, message, thinking_mode="auto"):
+    async def run():
+        return [chunk async for chunk in client.chat_stream_async(message, thinking_mode)]
+    return asyncio.run(run())
+
+
+def test_stream_yields_converted_chunks(client):
+    client, responses = client
+    chunks = _collect(client, "写一段代码")
+    
+    assert [chunk['type'] for chunk in chunks] == ['reasoning', 'content', 'content']
+    assert ''.join(chunk['content'] for chunk in chunks if chunk['type'] == 'content') == '你好世界'
+    assert all(chunk['response_id'] == 'resp_1' for chunk in chunks)
+    
+    request = responses.calls[0]
+    assert request['stream'] is True
+    assert request['previous_response_id'] is None
+    assert request['input'][0]['role'] == 'system'
+    assert request['input'][-1] == {'role': 'user', 'content': '写一段代码'}
+
+
+def test_stream_continues_the_response_chain(client):
+    client, responses = client
+    _collect(client, "第一个问题")
+    _collect(client, "第二个问题")
+    
+    assert responses.calls[1]['previous_response_id'] == 'resp_1'
+    assert responses.calls[1]['input'] == [{'role': 'user', 'content': '第二个问题'}]
+    assert client.previous_response_id == 'resp_2'
+    assert client.get_conversation_length() == 4
+
+
+def test_stream_reports_failure_as_none(client, capsys):
+    client, responses = client
+    
+    async def fail(**kwargs):
+        raise RuntimeError("network down")
+    responses.create = fail
+    
+    assert _collect(client, "你好") == [None]
+    assert "network down" in capsys.readouterr().out
+    assert client.previous_response_id is None
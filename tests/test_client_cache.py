@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""客户端回复缓存的测试：缓存键的计算、缓存回复的重放和完整的命中流程"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from src import client as client_module
+from src import config
+from src.client import DoubaoClient
+from src.utils.response_cache import ResponseCache
+
+# 不涉及时效信息的文本变换任务，请求中不附带联网搜索工具
+_LOCAL_MESSAGE = '把这句话翻译成英文：你好'
+
+
+class _FakeResponses:
+    def __init__(self):
+        self.calls = []
+    
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        response_id = f"resp_{len(self.calls)}"
+        return iter([
+            SimpleNamespace(type="response.created", response=SimpleNamespace(id=response_id)),
+            SimpleNamespace(type="response.reasoning_summary_text.delta", delta="思考"),
+            SimpleNamespace(type="response.output_text.delta", delta="Hello"),
+        ])
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    monkeypatch.setattr(config, 'ARK_API_KEY', 'test-key')
+    monkeypatch.setattr(config, 'ARK_ENDPOINT_ID', 'test-endpoint')
+    monkeypatch.setattr(config, 'SDK_PRELOAD_ENABLED', False)
+    monkeypatch.setattr(config, 'SESSION_PERSIST_ENABLED', False)
+    monkeypatch.setattr(config, 'STREAM_COALESCE_MS', 0)
+    monkeypatch.setattr(config, 'RESPONSE_CACHE_ENABLED', True)
+    cache = ResponseCache(storage_file=str(tmp_path / 'cache.db'))
+    monkeypatch.setattr(client_module, 'get_response_cache', lambda: cache)
+    client = DoubaoClient()
+    client._client = SimpleNamespace(responses=_FakeResponses())
+    return client
+
+
+def _params(client, message):
+    return client._build_request_params(client._build_input_messages(message), 'auto')
+
+
+def test_no_key_when_cache_disabled(client, monkeypatch):
+    monkeypatch.setattr(config, 'RESPONSE_CACHE_ENABLED', False)
+    assert client._get_cache_key(_params(client, _LOCAL_MESSAGE)) is None
+
+
+@pytest.mark.parametrize('message', ['今天北京天气怎么样', '写一篇介绍最新手机的文章'])
+def test_no_key_when_web_search_tool_attached(client, message):
+    params = _params(client, message)
+    assert params.get('tools')
+    assert client._get_cache_key(params) is None
+
+
+def test_key_for_local_request_depends_on_position(client):
+    params = _params(client, _LOCAL_MESSAGE)
+    assert 'tools' not in params
+    key = client._get_cache_key(params)
+    assert key is not None
+    assert client._get_cache_key(_params(client, _LOCAL_MESSAGE)) == key
+    
+    client.previous_response_id = 'resp_other'
+    assert client._get_cache_key(_params(client, _LOCAL_MESSAGE)) != key
+
+
+def test_replay_cached_yields_chunks_and_continues_chain(client):
+    cached = {'response_id': 'resp_cached', 'content': '回复', 'reasoning': '思考'}
+    chunks = list(client._replay_cached(cached, 'auto'))
+    
+    assert [(chunk['type'], chunk['reasoning'] or chunk['content']) for chunk in chunks] == [
+        ('reasoning', '思考'), ('content', '回复')
+    ]
+    assert all(chunk['response_id'] == 'resp_cached' for chunk in chunks)
+    assert client.previous_response_id == 'resp_cached'
+    assert client.conversation_count == 1
+
+
+def test_identical_request_at_same_position_is_served_from_cache(client):
+    first = list(client.chat_stream(_LOCAL_MESSAGE))
+    client.clear_history()
+    second = list(client.chat_stream(_LOCAL_MESSAGE))
+    
+    assert len(client.client.responses.calls) == 1
+    assert [chunk['content'] for chunk in second if chunk['type'] == 'content'] == ['Hello']
+    assert second[-1]['response_id'] == first[-1]['response_id'] == 'resp_1'
+    assert client.previous_response_id == 'resp_1'
+
+
+def test_web_search_request_is_never_cached(client):
+    list(client.chat_stream('今天有什么新闻'))
+    client.clear_history()
+    list(client.chat_stream('今天有什么新闻'))
+    assert len(client.client.responses.calls) == 2
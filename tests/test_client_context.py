@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""上下文压缩的测试：轮数统计、以摘要开启新上下文链，以及摘要的保存和恢复"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from src import config
+from src.client import DoubaoClient
+
+
+class _FakeResponses:
+    """流式请求返回固定回复，非流式请求（摘要）返回摘要文本"""
+    
+    def __init__(self):
+        self.calls = []
+        self.summary_calls = []
+    
+    def create(self, **kwargs):
+        if not kwargs.get('stream'):
+            self.summary_calls.append(kwargs)
+            return SimpleNamespace(output_text='之前聊了天气')
+        self.calls.append(kwargs)
+        response_id = f"resp_{len(self.calls)}"
+        return iter([
+            SimpleNamespace(type="response.created", response=SimpleNamespace(id=response_id)),
+            SimpleNamespace(type="response.output_text.delta", delta=f"回复{len(self.calls)}"),
+        ])
+
+
+@pytest.fixture
+def configure(monkeypatch, tmp_path):
+    monkeypatch.setattr(config, 'ARK_API_KEY', 'test-key')
+    monkeypatch.setattr(config, 'ARK_ENDPOINT_ID', 'test-endpoint')
+    monkeypatch.setattr(config, 'SDK_PRELOAD_ENABLED', False)
+    monkeypatch.setattr(config, 'RESPONSE_CACHE_ENABLED', False)
+    monkeypatch.setattr(config, 'STREAM_COALESCE_MS', 0)
+    monkeypatch.setattr(config, 'SESSION_PERSIST_ENABLED', True)
+    monkeypatch.setattr(config, 'SESSION_FILE', str(tmp_path / 'session.json'))
+    monkeypatch.setattr(config, 'CONTEXT_MAX_TURNS', 2)
+    monkeypatch.setattr(config, 'CONTEXT_KEEP_TURNS', 1)
+    return monkeypatch
+
+
+def _make_client():
+    client = DoubaoClient()
+    client._client = SimpleNamespace(responses=_FakeResponses())
+    return client
+
+
+def test_compaction_is_off_by_default():
+    assert config.CONTEXT_MAX_TURNS == 0
+
+
+def test_chain_is_not_compacted_before_the_limit(configure):
+    client = _make_client()
+    list(client.chat_stream("第一轮"))
+    list(client.chat_stream("第二轮"))
+    
+    assert client._chain_turns == 2
+    assert client.client.responses.summary_calls == []
+    assert client.client.responses.calls[1]['previous_response_id'] == 'resp_1'
+
+
+def test_compaction_seeds_new_chain_with_summary_and_recent_turns(configure):
+    client = _make_client()
+    for i in range(3):
+        list(client.chat_stream(f"第{i + 1}轮"))
+    responses = client.client.responses
+    
+    assert responses.summary_calls[0]['previous_response_id'] == 'resp_2'
+    request = responses.calls[2]
+    assert request['previous_response_id'] is None
+    assert [(message['role'], message['content']) for message in request['input'][1:]] == [
+        ('system', '## 之前对话的摘要\n之前聊了天气'),
+        ('user', '第2轮'),
+        ('assistant', '回复2'),
+        ('user', '第3轮'),
+    ]
+    assert request['input'][0] is client._system_message
+    assert client._chain_turns == 1
+    assert client.conversation_count == 3
+
+
+def test_summary_survives_restart(configure):
+    client = _make_client()
+    for i in range(2):
+        list(client.chat_stream(f"第{i + 1}轮"))
+    client._maybe_compact_context()
+    
+    restored = _make_client()
+    assert restored.previous_response_id is None
+    assert restored._context_summary == '之前聊了天气'
+    assert list(restored._recent_turns) == [('第2轮', '回复2')]
+    
+    list(restored.chat_stream("继续"))
+    assert restored.client.responses.calls[0]['input'][1]['content'].endswith('之前聊了天气')
+
+
+def test_clearing_drops_the_summary(configure):
+    client = _make_client()
+    for i in range(2):
+        list(client.chat_stream(f"第{i + 1}轮"))
+    client._maybe_compact_context()
+    
+    client.clear_history()
+    assert client._context_summary is None
+    assert list(client._recent_turns) == []
+    assert _make_client()._context_summary is None
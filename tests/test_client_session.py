@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""会话恢复的测试：保存与恢复、过期、格式错误的文件，以及恢复的上下文链失效后的重试"""
+
+import json
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from src import config
+from src.client import DoubaoClient
+
+
+class _ApiError(Exception):
+    """模拟 SDK 的 API 状态错误"""
+    
+    def __init__(self, status_code, message, code=None, param=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.message = message
+        self.code = code
+        self.param = param
+
+
+class _FakeResponses:
+    def __init__(self):
+        self.calls = []
+        self.errors = []  # 依次抛出的错误，用完后正常返回
+    
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        if self.errors:
+            raise self.errors.pop(0)
+        response_id = f"resp_{len(self.calls)}"
+        return iter([
+            SimpleNamespace(type="response.created", response=SimpleNamespace(id=response_id)),
+            SimpleNamespace(type="response.output_text.delta", delta="好的"),
+        ])
+
+
+@pytest.fixture
+def session_file(monkeypatch, tmp_path):
+    monkeypatch.setattr(config, 'ARK_API_KEY', 'test-key')
+    monkeypatch.setattr(config, 'ARK_ENDPOINT_ID', 'test-endpoint')
+    monkeypatch.setattr(config, 'SDK_PRELOAD_ENABLED', False)
+    monkeypatch.setattr(config, 'RESPONSE_CACHE_ENABLED', False)
+    monkeypatch.setattr(config, 'STREAM_COALESCE_MS', 0)
+    monkeypatch.setattr(config, 'SESSION_PERSIST_ENABLED', True)
+    path = tmp_path / 'session.json'
+    monkeypatch.setattr(config, 'SESSION_FILE', str(path))
+    return path
+
+
+def _make_client():
+    client = DoubaoClient()
+    client._client = SimpleNamespace(responses=_FakeResponses())
+    return client
+
+
+def test_session_is_saved_and_restored(session_file):
+    client = _make_client()
+    list(client.chat_stream("你好"))
+    assert json.loads(session_file.read_text(encoding='utf-8'))['previous_response_id'] == 'resp_1'
+    
+    restored = _make_client()
+    assert restored.previous_response_id == 'resp_1'
+    assert restored.conversation_count == 1
+
+
+def test_expired_session_is_discarded(session_file, monkeypatch):
+    list(_make_client().chat_stream("你好"))
+    session = json.loads(session_file.read_text(encoding='utf-8'))
+    session['saved_at'] = time.time() - config.SESSION_MAX_AGE - 1
+    session_file.write_text(json.dumps(session), encoding='utf-8')
+    
+    assert _make_client().previous_response_id is None
+    assert not session_file.exists()
+
+
+@pytest.mark.parametrize('content', [
+    '[]',
+    'null',
+    '"session"',
+    '{"model": "test-endpoint", "conversation_count": "3"}',
+    '{"model": "test-endpoint", "system_prompt_hash": "x", "recent_turns": [["只有提问"]]}',
+])
+def test_malformed_session_file_is_ignored(session_file, content):
+    session_file.write_text(content, encoding='utf-8')
+    client = _make_client()
+    assert client.previous_response_id is None
+    assert not session_file.exists()
+
+
+def _restored_client(session_file):
+    list(_make_client().chat_stream("你好"))
+    client = _make_client()
+    assert client.previous_response_id == 'resp_1'
+    return client
+
+
+def test_stale_restored_chain_is_dropped_and_retried(session_file):
+    client = _restored_client(session_file)
+    responses = client.client.responses
+    responses.errors.append(_ApiError(
+        404, "The previous_response_id resp_1 was not found", param='previous_response_id'
+    ))
+    
+    chunks = list(client.chat_stream("继续"))
+    
+    assert [call['previous_response_id'] for call in responses.calls] == ['resp_1', None]
+    assert chunks[-1]['content'] == '好的'
+    assert client.previous_response_id == 'resp_2'
+    assert client.conversation_count == 1
+
+
+def test_other_bad_request_keeps_restored_chain(session_file):
+    client = _restored_client(session_file)
+    responses = client.client.responses
+    responses.errors.append(_ApiError(400, "Input text may contain sensitive information",
+                                      code='InputTextSensitiveContentDetected'))
+    
+    assert list(client.chat_stream("继续")) == [None]
+    assert len(responses.calls) == 1
+    assert client.previous_response_id == 'resp_1'
+    assert session_file.exists()
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""流式文本增量合并的测试"""
+
+from src.client import _coalesce_deltas
+
+
+def _chunk(kind, text=None):
+    chunk = {'type': kind, 'content': None, 'reasoning': None}
+    if text is not None:
+        chunk[kind] = text
+    return chunk
+
+
+def _texts(chunks):
+    return [(chunk['type'], chunk.get(chunk['type'])) for chunk in chunks]
+
+
+def test_zero_window_passes_chunks_through():
+    chunks = [_chunk('content', 'a'), _chunk('content', 'b')]
+    assert _texts(_coalesce_deltas(iter(chunks), 0)) == [('content', 'a'), ('content', 'b')]
+
+
+def test_consecutive_deltas_are_merged_until_type_changes():
+    chunks = [
+        _chunk('reasoning', '想'),
+        _chunk('reasoning', '一'),
+        _chunk('reasoning', '想'),
+        _chunk('web_search_start'),
+        _chunk('content', '你'),
+        _chunk('content', '好'),
+    ]
+    # 窗口足够长：第一块立即输出，之后的增量一直合并到类型变化或结束
+    assert _texts(_coalesce_deltas(iter(chunks), 9000)) == [
+        ('reasoning', '想'),
+        ('reasoning', '一想'),
+        ('web_search_start', None),
+        ('content', '你好'),
+    ]
+
+
+def test_max_parts_forces_output():
+    chunks = [_chunk('content', str(i)) for i in range(5)]
+    assert _texts(_coalesce_deltas(iter(chunks), 9000, max_parts=2)) == [
+        ('content', '0'), ('content', '12'), ('content', '34')
+    ]
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""输入解码修复的测试"""
+
+import io
+import sys
+
+import pytest
+
+from src.utils.input_handler import InputHandler, _decode_with_repair, read_line
+
+
+def test_valid_utf8_is_returned_unchanged():
+    assert _decode_with_repair('你好 hello\n'.encode('utf-8')) == ('你好 hello', '你好 hello')
+
+
+def test_gbk_input_falls_back_to_gb18030():
+    data = '你好，世界\n'.encode('gbk')
+    assert _decode_with_repair(data) == ('你好，世界', '你好，世界')
+
+
+def test_broken_utf8_keeps_valid_characters():
+    # 删除汉字时只删掉了半个 UTF-8 字符：保留能识别的部分，不改按 gb18030 解码
+    data = '你好'.encode('utf-8')[:-1] + b'\n'
+    displayed, cleaned = _decode_with_repair(data)
+    assert displayed == '你�'
+    assert cleaned == '你'
+
+
+def test_undecodable_bytes_are_replaced():
+    displayed, cleaned = _decode_with_repair(b'ab\xff\xff\n')
+    assert displayed == 'ab��'
+    assert cleaned == 'ab'
+
+
+def test_read_line_and_input_handler_share_piped_input(monkeypatch, capsys):
+    data = 'KEY\nEP\nhello\n你好\n'.encode('utf-8')
+    monkeypatch.setattr(sys, 'stdin', io.TextIOWrapper(io.BytesIO(data), encoding='utf-8'))
+    handler = InputHandler()
+    
+    def get_input():
+        return handler.get_input('> ', lambda *args, **kwargs: None, {}, {}, False)
+    
+    assert read_line('API Key: ') == 'KEY'
+    assert read_line() == 'EP'
+    assert get_input() == 'hello'
+    assert get_input() == '你好'
+    with pytest.raises(EOFError):
+        read_line()
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""回复缓存的测试：过期、LRU 淘汰和缓存键的稳定性"""
+
+import pytest
+
+from src.utils import response_cache
+from src.utils.response_cache import ResponseCache
+
+
+class _Clock:
+    """可手动拨动的 time.time 替身"""
+    
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+    
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(response_cache.time, 'time', clock)
+    return clock
+
+
+def _make_cache(tmp_path, **kwargs) -> ResponseCache:
+    return ResponseCache(storage_file=str(tmp_path / 'cache.db'), **kwargs)
+
+
+def test_hit_returns_stored_reply(tmp_path, clock):
+    cache = _make_cache(tmp_path)
+    cache.put('k', 'resp_1', '回复', '思考')
+    assert cache.get('k') == {'response_id': 'resp_1', 'content': '回复', 'reasoning': '思考'}
+    assert cache.get('other') is None
+
+
+def test_entry_expires_after_ttl(tmp_path, clock):
+    cache = _make_cache(tmp_path, ttl=60)
+    cache.put('k', 'resp_1', '回复')
+    
+    clock.now += 60
+    assert cache.get('k') is not None
+    
+    clock.now += 1
+    assert cache.get('k') is None
+    # 过期记录查询时即被删除，时间倒回也不会再命中
+    clock.now -= 30
+    assert cache.get('k') is None
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path, clock):
+    cache = _make_cache(tmp_path, max_entries=2)
+    cache.put('a', 'resp_a', 'A')
+    clock.now += 1
+    cache.put('b', 'resp_b', 'B')
+    clock.now += 1
+    # 访问 a 后，最久未使用的是 b
+    assert cache.get('a') is not None
+    clock.now += 1
+    cache.put('c', 'resp_c', 'C')
+    
+    assert cache.get('b') is None
+    assert cache.get('a') is not None
+    assert cache.get('c') is not None
+
+
+def _params(content: str, **overrides) -> dict:
+    params = {
+        'model': 'ep',
+        'input': [{'role': 'user', 'content': content}],
+        'previous_response_id': None,
+        'thinking': {'type': 'auto'},
+    }
+    params.update(overrides)
+    return params
+
+
+def test_key_ignores_dict_order():
+    key = ResponseCache.make_key(_params('你好 世界'))
+    reordered = dict(reversed(list(_params('你好 世界').items())))
+    assert ResponseCache.make_key(reordered) == key
+
+
+def test_key_keeps_whitespace():
+    code = '修复这段代码：\nif a:\n    b()\nc()'
+    flattened = '修复这段代码： if a: b() c()'
+    assert ResponseCache.make_key(_params(code)) != ResponseCache.make_key(_params(flattened))
+
+
+def test_key_unifies_unicode_composition():
+    composed = ResponseCache.make_key(_params('caf\u00e9'))
+    decomposed = ResponseCache.make_key(_params('cafe\u0301'))
+    assert composed == decomposed
+
+
+@pytest.mark.parametrize('first, second', [
+    ('Hello world', 'hello world'),
+    ('为什么?', '为什么!'),
+    ('a.b()', 'ab()'),
+])
+def test_key_keeps_case_and_punctuation(first, second):
+    assert ResponseCache.make_key(_params(first)) != ResponseCache.make_key(_params(second))
+
+
+def test_key_depends_on_conversation_position():
+    assert (ResponseCache.make_key(_params('你好'))
+            != ResponseCache.make_key(_params('你好', previous_response_id='resp_1')))
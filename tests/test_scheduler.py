@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""后台调度器的测试：一次性延迟任务的执行顺序与取消"""
+
+import threading
+
+from src.utils.scheduler import Scheduler
+
+
+def test_call_later_runs_in_delay_order():
+    scheduler = Scheduler()
+    order = []
+    done = threading.Event()
+    
+    def record(name):
+        order.append(name)
+        if len(order) == 3:
+            done.set()
+    
+    scheduler.call_later(0.15, lambda: record('c'))
+    scheduler.call_later(0.05, lambda: record('a'))
+    scheduler.call_later(0.10, lambda: record('b'))
+    
+    assert done.wait(2)
+    assert order == ['a', 'b', 'c']
+
+
+def test_call_later_runs_only_once():
+    scheduler = Scheduler()
+    calls = []
+    scheduler.call_later(0.01, lambda: calls.append(1))
+    # 排在其后的任务执行时，前一个一次性任务已经执行并移除
+    finished = threading.Event()
+    scheduler.call_later(0.2, finished.set)
+    
+    assert finished.wait(2)
+    assert calls == [1]
+
+
+def test_cancelled_task_does_not_run():
+    scheduler = Scheduler()
+    calls = []
+    finished = threading.Event()
+    
+    registration = scheduler.call_later(0.05, lambda: calls.append('cancelled'))
+    scheduler.call_later(0.1, finished.set)
+    registration.cancel()
+    
+    assert finished.wait(2)
+    assert calls == []
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""流式输出处理器的测试：延迟刷新的安排与取消"""
+
+import asyncio
+
+import pytest
+
+from src import ui
+from src.ui import StreamOutputHandler
+
+
+@pytest.fixture(autouse=True)
+def flush_delay(monkeypatch):
+    monkeypatch.setattr(ui, 'STREAM_FLUSH_MS', 30)
+
+
+def test_write_schedules_a_single_delayed_flush():
+    async def run():
+        handler = StreamOutputHandler()
+        handler._write_stream('你', 'bot_text')
+        handle = handler._flush_handle
+        handler._write_stream('好', 'bot_text')
+        assert handle is not None and handler._flush_handle is handle
+        await asyncio.sleep(0.06)
+        assert handler._flush_handle is None
+    asyncio.run(run())
+
+
+def test_reset_cancels_pending_flush():
+    async def run():
+        handler = StreamOutputHandler()
+        handler._write_stream('上一轮', 'bot_text')
+        handle = handler._flush_handle
+        handler.reset()
+        assert handler._flush_handle is None
+        assert handle.cancelled()
+    asyncio.run(run())
+
+
+def test_write_without_event_loop_flushes_immediately(capsys):
+    handler = StreamOutputHandler()
+    handler._write_stream('同步', 'bot_text')
+    assert handler._flush_handle is None
+    assert '同步' in capsys.readouterr().out
+
+
+class _FailingClient:
+    """输出一段回复后中途失败"""
+    
+    async def chat_stream_async(self, message, thinking_mode):
+        yield {'type': 'content', 'content': '部分回复', 'reasoning': None, 'response_id': 'resp_1'}
+        raise RuntimeError('连接中断')
+
+
+def test_partial_reply_is_flushed_before_error(capsys):
+    import main
+    
+    handler = StreamOutputHandler()
+    result = asyncio.run(main.process_ai_response(_FailingClient(), handler, '你好', 'auto', ''))
+    
+    assert result == (None, None)
+    assert handler._flush_handle is None
+    out = capsys.readouterr().out
+    assert '部分回复' in out
+    assert out.index('部分回复') < out.index('连接中断')
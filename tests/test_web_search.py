@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+"""联网搜索判断的测试"""
+
+import pytest
+
+from src import config
+from src.client import _needs_web_search
+
+
+@pytest.mark.parametrize('message', [
+    '把这句话翻译成英文：我爱你',
+    '帮我润色一下这段文字',
+    '写一个匹配邮箱的正则',
+    '把下面的 JSON 格式化',
+])
+def test_text_transform_tasks_skip_web_search(message):
+    assert _needs_web_search(message) is False
+
+
+@pytest.mark.parametrize('message', [
+    '写一篇介绍2024年巴黎奥运会中国队成绩的文章',
+    '计算一下特斯拉市值是苹果的几倍',
+    '用代码实现一个获取比特币行情的脚本',
+    '今天北京天气怎么样',
+    '翻译一下最新的新闻标题',
+])
+def test_factual_or_time_sensitive_prompts_keep_web_search(message):
+    assert _needs_web_search(message) is True
+
+
+def test_heuristic_can_be_disabled(monkeypatch):
+    monkeypatch.setattr(config, 'WEB_SEARCH_SKIP_LOCAL_TASKS', False)
+    assert _needs_web_search('把这句话翻译成英文') is True